@@ -5,10 +5,18 @@ This module loads its values from environment variables.
 """
 import os
 import logging
-from typing import Optional
+from dataclasses import dataclass
+from enum import IntEnum
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional
 
 logger = logging.getLogger(__name__)
 
+def _env_flag(name: str, default: bool) -> bool:
+    """Reads a "1"/"0" feature toggle from the environment once, at import time."""
+    return os.getenv(name, "1" if default else "0") == "1"
+
 # --- Core Credentials & Bot Identity ---
 TELEGRAM_BOT_TOKEN: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN")
 BOT_OWNER_ID: Optional[int] = None
@@ -25,6 +33,8 @@ PERSISTENCE_DIR = os.path.join(DATA_DIR, "persistence")
 DB_DIR = os.path.join(DATA_DIR, "database")
 PERSONAS_PATH = os.getenv("PERSONAS_PATH", "personas")
 SCENERIES_PATH = os.getenv("SCENERIES_PATH", "sceneries")
+PERSONAS_CACHE_FILE = os.path.join(PERSISTENCE_DIR, "personas.cache.pkl")
+SCENERIES_CACHE_FILE = os.path.join(PERSISTENCE_DIR, "sceneries.cache.pkl")
 
 # --- Database & Vector Memory Configuration ---
 CONVERSATION_DB_FILE = os.path.join(DB_DIR, "conversation_history.db")
@@ -32,72 +42,118 @@ VECTOR_DB_PATH = os.path.join(DB_DIR, "vector_memory")
 VECTOR_DB_COLLECTION = "memory_collection"
 EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
 SEMANTIC_SEARCH_K_RESULTS = 3
-VECTOR_MEMORY_ENABLED = os.getenv("VECTOR_MEMORY_ENABLED", "1") == "1"
+VECTOR_MEMORY_ENABLED = _env_flag("VECTOR_MEMORY_ENABLED", True)
 
 # --- AI Model & API Configuration ---
 LM_STUDIO_API_BASE: Optional[str] = os.getenv("LM_STUDIO_API_BASE")
 AI_TIMEOUT = 300.0
 MAX_RESPONSE_TOKENS = 1024
 MAX_PROMPT_TOKENS = 3072
-AI_PARAMS = {
-    "chat": {"model": os.getenv("LM_STUDIO_CHAT_MODEL", "lm-studio-chat-default"), "temperature": 0.7},
-    "creative": {"model": os.getenv("LM_STUDIO_CREATIVE_MODEL", "lm-studio-creative-default"), "temperature": 1.1},
-    "utility": {"model": os.getenv("LM_STUDIO_UTILITY_MODEL", "lm-studio-utility-default"), "temperature": 0.5},
-}
+# Ask llama.cpp-based servers to keep the KV cache of the shared prompt prefix
+# (persona/system prompt) between requests. Unknown to plain OpenAI-style servers.
+AI_CACHE_PROMPT = _env_flag("AI_CACHE_PROMPT", False)
+
+@dataclass(frozen=True, slots=True)
+class AIParams:
+    """Model selection and sampling settings for one AI task type."""
+    model: str
+    temperature: float
+
+# Read-only after import; use get_ai_params() on hot paths.
+AI_PARAMS: Mapping[str, AIParams] = MappingProxyType({
+    "chat": AIParams(model=os.getenv("LM_STUDIO_CHAT_MODEL", "lm-studio-chat-default"), temperature=0.7),
+    "creative": AIParams(model=os.getenv("LM_STUDIO_CREATIVE_MODEL", "lm-studio-creative-default"), temperature=1.1),
+    "utility": AIParams(model=os.getenv("LM_STUDIO_UTILITY_MODEL", "lm-studio-utility-default"), temperature=0.5),
+})
+
+@lru_cache(maxsize=8)
+def get_ai_params(task_type: str) -> AIParams:
+    """Returns the AI parameters for a task type, falling back to 'chat'."""
+    return AI_PARAMS.get(task_type, AI_PARAMS["chat"])
+
+# The chat model is needed on every message (token counting), so it is hoisted.
+CHAT_MODEL: str = AI_PARAMS["chat"].model
 
 # --- Performance & Rate Limiting ---
 STREAM_UPDATE_INTERVAL = 1.5
+STREAM_MIN_EDIT_CHARS = 40 # new characters required before another streaming edit
 USER_RATE_LIMIT = 1.0
-PERFORMANCE_REPORTING_ENABLED = os.getenv("PERFORMANCE_REPORTING_ENABLED", "0") == "1"
+PERFORMANCE_REPORTING_ENABLED = _env_flag("PERFORMANCE_REPORTING_ENABLED", False)
 SUMMARY_THRESHOLD = 10
 
 # --- User chat logging ---
-LOG_USER_CHAT_MESSAGES = os.getenv("LOG_USER_CHAT_MESSAGES", "0") == "1"
-LOG_USER_COMMANDS = os.getenv("LOG_USER_COMMANDS", "0") == "1"
-LOG_USER_UI_INTERACTIONS = os.getenv("LOG_USER_UI_INTERACTIONS", "0") == "1"
+LOG_USER_CHAT_MESSAGES = _env_flag("LOG_USER_CHAT_MESSAGES", False)
+LOG_USER_COMMANDS = _env_flag("LOG_USER_COMMANDS", False)
+LOG_USER_UI_INTERACTIONS = _env_flag("LOG_USER_UI_INTERACTIONS", False)
 
 
 # --- Debugging Configuration ---
-DEBUG_LOGGING = os.getenv("DEBUG_LOGGING", "0") == "1"
+DEBUG_LOGGING = _env_flag("DEBUG_LOGGING", False)
 
 # --- Conversation Handler States (FIXED) ---
-(
+class ConvState(IntEnum):
     # === Main Conversation Flow ===
-    START_SETUP_NAME,         # 0
-    ASK_PROFILE,              # 1
-    ASK_GENDER,               # 2 (Restored)
-    ASK_ROLE,                 # 3 (Restored)
-    ASK_NSFW_ONBOARDING,      # 4
-    SETUP_HUB,                # 5
+    START_SETUP_NAME = 0
+    ASK_PROFILE = 1
+    ASK_GENDER = 2 # (Restored)
+    ASK_ROLE = 3 # (Restored)
+    ASK_NSFW_ONBOARDING = 4
+    SETUP_HUB = 5
 
     # === Profile Editing Flow ===
-    PROFILE_HUB,              # 6
-    EDIT_NAME_PROMPT,         # 7
-    EDIT_PROFILE_PROMPT,      # 8
-    EDIT_EXTRAS_MENU,         # 9 (Restored)
+    PROFILE_HUB = 6
+    EDIT_NAME_PROMPT = 7
+    EDIT_PROFILE_PROMPT = 8
+    EDIT_EXTRAS_MENU = 9 # (Restored)
 
     # === Persona Management Flow ===
-    PERSONA_MENU,             # 10
-    CUSTOM_PERSONA_NAME,      # 11
-    CUSTOM_PERSONA_PROMPT,    # 12
+    PERSONA_MENU = 10
+    CUSTOM_PERSONA_NAME = 11
+    CUSTOM_PERSONA_PROMPT = 12
 
     # === Scenery Management Flow ===
-    SCENERY_MENU,             # 13
-    SCENE_GENRE_SELECT,       # 14
-    CUSTOM_SCENERY_NAME,      # 15
-    CUSTOM_SCENERY_PROMPT,    # 16
+    SCENERY_MENU = 13
+    SCENE_GENRE_SELECT = 14
+    CUSTOM_SCENERY_NAME = 15
+    CUSTOM_SCENERY_PROMPT = 16
 
     # === Data Management Flow ===
-    DELETE_MENU,              # 17
-    DELETE_CUSTOM_PERSONA_SELECT, # 18
-    DELETE_CUSTOM_SCENERY_SELECT, # 19 <<< NEW
+    DELETE_MENU = 17
+    DELETE_CUSTOM_PERSONA_SELECT = 18
+    DELETE_CUSTOM_SCENERY_SELECT = 19 # <<< NEW
 
     # === Nested NSFW Persona Generation States ===
-    NSFW_GEN_START,           # 20
-    NSFW_GEN_SPECIES,         # 21
-    NSFW_GEN_GENDER,          # 22
-    NSFW_GEN_ROLE,            # 23
-    NSFW_GEN_FETISHES,        # 24
-    NSFW_GEN_CONFIRM,         # 25
-
-) = range(26) # (Updated count)
\ No newline at end of file
+    NSFW_GEN_START = 20
+    NSFW_GEN_SPECIES = 21
+    NSFW_GEN_GENDER = 22
+    NSFW_GEN_ROLE = 23
+    NSFW_GEN_FETISHES = 24
+    NSFW_GEN_CONFIRM = 25
+
+# Module-level aliases so handlers can keep using config.<STATE>.
+START_SETUP_NAME = ConvState.START_SETUP_NAME
+ASK_PROFILE = ConvState.ASK_PROFILE
+ASK_GENDER = ConvState.ASK_GENDER
+ASK_ROLE = ConvState.ASK_ROLE
+ASK_NSFW_ONBOARDING = ConvState.ASK_NSFW_ONBOARDING
+SETUP_HUB = ConvState.SETUP_HUB
+PROFILE_HUB = ConvState.PROFILE_HUB
+EDIT_NAME_PROMPT = ConvState.EDIT_NAME_PROMPT
+EDIT_PROFILE_PROMPT = ConvState.EDIT_PROFILE_PROMPT
+EDIT_EXTRAS_MENU = ConvState.EDIT_EXTRAS_MENU
+PERSONA_MENU = ConvState.PERSONA_MENU
+CUSTOM_PERSONA_NAME = ConvState.CUSTOM_PERSONA_NAME
+CUSTOM_PERSONA_PROMPT = ConvState.CUSTOM_PERSONA_PROMPT
+SCENERY_MENU = ConvState.SCENERY_MENU
+SCENE_GENRE_SELECT = ConvState.SCENE_GENRE_SELECT
+CUSTOM_SCENERY_NAME = ConvState.CUSTOM_SCENERY_NAME
+CUSTOM_SCENERY_PROMPT = ConvState.CUSTOM_SCENERY_PROMPT
+DELETE_MENU = ConvState.DELETE_MENU
+DELETE_CUSTOM_PERSONA_SELECT = ConvState.DELETE_CUSTOM_PERSONA_SELECT
+DELETE_CUSTOM_SCENERY_SELECT = ConvState.DELETE_CUSTOM_SCENERY_SELECT
+NSFW_GEN_START = ConvState.NSFW_GEN_START
+NSFW_GEN_SPECIES = ConvState.NSFW_GEN_SPECIES
+NSFW_GEN_GENDER = ConvState.NSFW_GEN_GENDER
+NSFW_GEN_ROLE = ConvState.NSFW_GEN_ROLE
+NSFW_GEN_FETISHES = ConvState.NSFW_GEN_FETISHES
+NSFW_GEN_CONFIRM = ConvState.NSFW_GEN_CONFIRM
\ No newline at end of file
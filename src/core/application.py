@@ -6,10 +6,11 @@ import logging
 import os
 import asyncio
 from telegram import BotCommand
-from telegram.ext import Application, ApplicationBuilder, PicklePersistence
+from telegram.ext import Application, ApplicationBuilder
 
 import src.config as config
 from src.core import tasks
+from src.core.persistence import SQLitePersistence
 from src.utils import logging as logging_utils
 from src.utils import files as file_utils
 from src.utils import error_handler
@@ -17,24 +18,40 @@ from src import services
 from src import handlers
 
 logger = logging.getLogger(__name__)
-background_tasks = set()
-
-# Ensure required directories exist
-REQUIRED_DIRS = [
-    config.DATA_DIR,
-    config.LOGS_DIR,
-    config.USER_LOGS_DIR,
-    config.PERSISTENCE_DIR,
-    config.DB_DIR,
-    config.PERSONAS_PATH,
-    config.SCENERIES_PATH,
-]
+background_tasks: dict[str, asyncio.Task] = {}
+
+# The command menu never changes at runtime, so it is built once per process.
+_BOT_COMMANDS = (
+    BotCommand("start", "Restart & begin setup"),
+    BotCommand("setup", "Configure your character & persona"),
+    BotCommand("regenerate", "Redo the last AI response"),
+    BotCommand("clear", "Clear conversation history"),
+    BotCommand("help", "Show help and commands"),
+    BotCommand("admin", "Bot owner commands"),
+)
+
+# Ensure required directories exist. Sorted shallowest first so parents are
+# created before their children, which then usually already exist.
+REQUIRED_DIRS = sorted(
+    [
+        config.DATA_DIR,
+        config.LOGS_DIR,
+        config.USER_LOGS_DIR,
+        config.PERSISTENCE_DIR,
+        config.DB_DIR,
+        config.PERSONAS_PATH,
+        config.SCENERIES_PATH,
+    ],
+    key=lambda path: os.path.normpath(path).count(os.sep),
+)
 
 def ensure_directories():
+    # Runs once, from create_app(), before logging is set up (the log files live in LOGS_DIR).
     for path in REQUIRED_DIRS:
         try:
-            os.makedirs(path, exist_ok=True)
-            logger.debug(f"Ensured directory exists: {path}")
+            # A single stat is enough when the directory is already there.
+            if not os.path.isdir(path):
+                os.makedirs(path, exist_ok=True)
         except Exception as e:
             logger.critical(f"Failed to create directory {path}: {e}")
             # If critical directories cannot be created, raise to prevent bot from starting
@@ -44,9 +61,7 @@ async def post_init(application: Application):
     # Local import to avoid potential circular dependency during startup phase
     from src.handlers.admin import load_admin_toggles
 
-    ensure_directories() # Ensure directories early, before logging attempts to write files
-
-    # Initialize services after directories are ensured and config is loaded
+    # Initialize services; create_app() has already ensured the required directories
     services.database.init_db()
     services.ai_models.init_ai_client()
     if services.ai_models.ai_client is None:
@@ -57,40 +72,39 @@ async def post_init(application: Application):
 
     # Load personas and sceneries from their respective directories in the root
     # Use config.PERSONAS_PATH and config.SCENERIES_PATH directly
-    application.bot_data['personas'] = file_utils.load_from_directory(config.PERSONAS_PATH, key_name="name")
-    sceneries_full_data = file_utils.load_from_directory(config.SCENERIES_PATH, key_name="name")
+    personas, sceneries_full_data = await asyncio.gather(
+        file_utils.load_from_directory_cached(config.PERSONAS_PATH, config.PERSONAS_CACHE_FILE, key_name="name"),
+        file_utils.load_from_directory_cached(config.SCENERIES_PATH, config.SCENERIES_CACHE_FILE, key_name="name"),
+    )
+    application.bot_data['personas'] = personas
     application.bot_data['sceneries_full_data'] = sceneries_full_data
     application.bot_data['sceneries'] = { name: data.get('description', '') for name, data in sceneries_full_data.items() }
     logger.info(f"Loaded {len(application.bot_data['personas'])} personas and {len(application.bot_data['sceneries'])} sceneries.")
 
     logger.info("Starting background tasks...")
-    task_coroutines = [
-        tasks.health_check_task(application),
-        tasks.unblock_users_task(application) # New: Task to unblock timed users
-    ]
+    task_coroutines = {
+        "health_check": tasks.health_check_task(application),
+        "unblock_users": tasks.unblock_users_task(application) # New: Task to unblock timed users
+    }
 
     if config.PERFORMANCE_REPORTING_ENABLED:
-        task_coroutines.append(tasks.performance_report_task())
+        task_coroutines["performance_report"] = tasks.performance_report_task()
         logger.info("Performance reporting is ENABLED by config.")
     else:
         logger.info("Performance reporting is DISABLED by config.")
 
-    for task_coro in task_coroutines:
-        task = asyncio.create_task(task_coro)
-        background_tasks.add(task)
-        task.add_done_callback(background_tasks.discard)
+    if config.VECTOR_MEMORY_ENABLED and services.database.memory_collection is not None:
+        # Load the embedding model while polling starts instead of on the first message.
+        task_coroutines["embedder_warmup"] = tasks.embedder_warmup_task()
+
+    for name, task_coro in task_coroutines.items():
+        task = asyncio.create_task(task_coro, name=name)
+        background_tasks[name] = task
+        task.add_done_callback(lambda t: background_tasks.pop(t.get_name(), None))
     logger.info(f"{len(background_tasks)} background tasks scheduled.")
 
     logger.info("Setting bot command menu...")
-    commands = [
-        BotCommand("start", "Restart & begin setup"),
-        BotCommand("setup", "Configure your character & persona"),
-        BotCommand("regenerate", "Redo the last AI response"),
-        BotCommand("clear", "Clear conversation history"),
-        BotCommand("help", "Show help and commands"),
-        BotCommand("admin", "Bot owner commands"),
-    ]
-    await application.bot.set_my_commands(commands)
+    await application.bot.set_my_commands(_BOT_COMMANDS)
 
     # Load admin toggles at startup
     toggles = load_admin_toggles()
@@ -99,21 +113,25 @@ async def post_init(application: Application):
     logger.info("Bot command menu has been set.")
 
 async def post_shutdown(application: Application):
+    from src.handlers.admin import flush_admin_toggles
+    await flush_admin_toggles(application.bot_data)
+
     logger.info("Bot shutting down. Cancelling background tasks...")
 
     # Cancel all running background tasks
-    for task in list(background_tasks):
+    running_tasks = list(background_tasks.values())
+    for task in running_tasks:
         task.cancel()
 
-    if background_tasks:
-        done, pending = await asyncio.wait(background_tasks, timeout=5.0)
+    if running_tasks:
+        done, pending = await asyncio.wait(running_tasks, timeout=5.0)
 
         for task in done:
-            if task.exception():
-                if not isinstance(task.exception(), asyncio.CancelledError):
-                    logger.error(f"Background task {task.get_name()} raised an unexpected exception during shutdown: {task.exception()}", exc_info=True)
-                else:
-                    logger.info(f"Background task {task.get_name()} was successfully cancelled during shutdown.")
+            # exception() raises CancelledError on a cancelled task, so check that first.
+            if task.cancelled():
+                logger.info(f"Background task {task.get_name()} was successfully cancelled during shutdown.")
+            elif task.exception():
+                logger.error(f"Background task {task.get_name()} raised an unexpected exception during shutdown: {task.exception()}", exc_info=task.exception())
 
         for task in pending:
             logger.warning(f"Background task {task.get_name()} is still pending after shutdown timeout.")
@@ -133,8 +151,10 @@ def create_app() -> Application:
         logging.getLogger("telegram.ext").setLevel(logging.INFO)
         logging.getLogger("src.utils.files").setLevel(logging.INFO)
 
-    persistence = PicklePersistence(
-        filepath=os.path.join(config.PERSISTENCE_DIR, "bot_persistence.pickle")
+    persistence = SQLitePersistence(
+        filepath=os.path.join(config.PERSISTENCE_DIR, "bot_persistence.db"),
+        # Existing user setups are carried over from the previous pickle once.
+        legacy_pickle_path=os.path.join(config.PERSISTENCE_DIR, "bot_persistence.pickle"),
     )
 
     application = (
@@ -0,0 +1,236 @@
+# src/core/persistence.py
+"""
+SQLite-backed persistence for python-telegram-bot.
+
+Unlike PicklePersistence, which rewrites one pickle holding every user, chat and
+bot_data entry on each flush, this stores one pickled row per user, per chat and
+per bot_data key, and only writes the rows whose contents actually changed.
+"""
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import asyncio
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS user_data (user_id INTEGER PRIMARY KEY, data BLOB NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS chat_data (chat_id INTEGER PRIMARY KEY, data BLOB NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS bot_data (key BLOB PRIMARY KEY, data BLOB NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS callback_data (id INTEGER PRIMARY KEY CHECK (id = 0), data BLOB NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS conversations (name TEXT NOT NULL, key TEXT NOT NULL, state BLOB NOT NULL, PRIMARY KEY (name, key))",
+)
+
+def _dumps(obj: Any) -> bytes:
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    """PicklePersistence replaces Bot references with persistent IDs; they are dropped on import."""
+    def persistent_load(self, pid):
+        return None
+
+
+class SQLitePersistence(BasePersistence):
+    """
+    Stores user_data, chat_data, bot_data, callback_data and conversation states
+    in a dedicated SQLite file.
+
+    Args:
+        filepath (str): Path of the SQLite database file.
+        legacy_pickle_path (str, optional): A PicklePersistence file whose contents
+            are imported once, when the database is created.
+        store_data (PersistenceInput, optional): Which kinds of data to persist.
+        update_interval (float): Seconds between automatic flushes by the Application.
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        legacy_pickle_path: Optional[str] = None,
+        store_data: Optional[PersistenceInput] = None,
+        update_interval: float = 60,
+    ):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.filepath = filepath
+        self.legacy_pickle_path = legacy_pickle_path
+        self._conn: Optional[sqlite3.Connection] = None
+        # Serializes access to the single connection from the worker threads.
+        self._lock = threading.Lock()
+        # Last pickled bytes written per row, used to skip unchanged writes.
+        self._user_blobs: Dict[int, bytes] = {}
+        self._chat_blobs: Dict[int, bytes] = {}
+        self._bot_blobs: Dict[bytes, bytes] = {}
+        self._callback_blob: Optional[bytes] = None
+
+    # --- Connection handling (blocking, run in worker threads) ---
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            is_new = not os.path.exists(self.filepath)
+            os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.filepath, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+            if is_new:
+                self._import_legacy_pickle()
+        return self._conn
+
+    def _import_legacy_pickle(self):
+        """Seeds a freshly created database from the old PicklePersistence file."""
+        if not self.legacy_pickle_path or not os.path.isfile(self.legacy_pickle_path):
+            return
+        try:
+            with open(self.legacy_pickle_path, "rb") as f:
+                legacy = _LegacyUnpickler(f).load()
+        except Exception as e:
+            logger.warning(f"Could not import legacy persistence file {self.legacy_pickle_path}: {e}")
+            return
+
+        conn = self._conn
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO user_data (user_id, data) VALUES (?, ?)",
+                ((user_id, _dumps(data)) for user_id, data in (legacy.get("user_data") or {}).items()),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO chat_data (chat_id, data) VALUES (?, ?)",
+                ((chat_id, _dumps(data)) for chat_id, data in (legacy.get("chat_data") or {}).items()),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO bot_data (key, data) VALUES (?, ?)",
+                ((_dumps(key), _dumps(value)) for key, value in (legacy.get("bot_data") or {}).items()),
+            )
+            if legacy.get("callback_data") is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO callback_data (id, data) VALUES (0, ?)",
+                    (_dumps(legacy["callback_data"]),),
+                )
+            for name, states in (legacy.get("conversations") or {}).items():
+                conn.executemany(
+                    "INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)",
+                    ((name, json.dumps(list(key)), _dumps(state)) for key, state in states.items()),
+                )
+        logger.info(f"Imported legacy persistence data from {self.legacy_pickle_path}.")
+
+    def _fetch_all(self, query: str, params: Iterable[Any] = ()) -> list:
+        with self._lock:
+            return self._connect().execute(query, tuple(params)).fetchall()
+
+    def _write(self, query: str, params: Iterable[Any] = ()):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(query, tuple(params))
+
+    def _write_bot_data(self, changed: Dict[bytes, bytes], removed: Iterable[bytes]):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO bot_data (key, data) VALUES (?, ?)", changed.items())
+                conn.executemany("DELETE FROM bot_data WHERE key = ?", ((key,) for key in removed))
+
+    def _close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- Loading ---
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        rows = await asyncio.to_thread(self._fetch_all, "SELECT user_id, data FROM user_data")
+        self._user_blobs = {user_id: blob for user_id, blob in rows}
+        return {user_id: pickle.loads(blob) for user_id, blob in rows}
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        rows = await asyncio.to_thread(self._fetch_all, "SELECT chat_id, data FROM chat_data")
+        self._chat_blobs = {chat_id: blob for chat_id, blob in rows}
+        return {chat_id: pickle.loads(blob) for chat_id, blob in rows}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        rows = await asyncio.to_thread(self._fetch_all, "SELECT key, data FROM bot_data")
+        self._bot_blobs = {key: blob for key, blob in rows}
+        return {pickle.loads(key): pickle.loads(blob) for key, blob in rows}
+
+    async def get_callback_data(self) -> Optional[Any]:
+        rows = await asyncio.to_thread(self._fetch_all, "SELECT data FROM callback_data WHERE id = 0")
+        if not rows:
+            return None
+        self._callback_blob = rows[0][0]
+        return pickle.loads(self._callback_blob)
+
+    async def get_conversations(self, name: str) -> Dict[Tuple[int, ...], object]:
+        rows = await asyncio.to_thread(self._fetch_all, "SELECT key, state FROM conversations WHERE name = ?", (name,))
+        return {tuple(json.loads(key)): pickle.loads(state) for key, state in rows}
+
+    # --- Updating ---
+    async def update_conversation(self, name: str, key: Tuple[int, ...], new_state: Optional[object]) -> None:
+        key_text = json.dumps(list(key))
+        if new_state is None:
+            await asyncio.to_thread(self._write, "DELETE FROM conversations WHERE name = ? AND key = ?", (name, key_text))
+        else:
+            await asyncio.to_thread(
+                self._write,
+                "INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)",
+                (name, key_text, _dumps(new_state)),
+            )
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        blob = _dumps(data)
+        if self._user_blobs.get(user_id) == blob:
+            return
+        await asyncio.to_thread(self._write, "INSERT OR REPLACE INTO user_data (user_id, data) VALUES (?, ?)", (user_id, blob))
+        self._user_blobs[user_id] = blob
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        blob = _dumps(data)
+        if self._chat_blobs.get(chat_id) == blob:
+            return
+        await asyncio.to_thread(self._write, "INSERT OR REPLACE INTO chat_data (chat_id, data) VALUES (?, ?)", (chat_id, blob))
+        self._chat_blobs[chat_id] = blob
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        current = {_dumps(key): _dumps(value) for key, value in data.items()}
+        changed = {key: blob for key, blob in current.items() if self._bot_blobs.get(key) != blob}
+        removed = [key for key in self._bot_blobs if key not in current]
+        if not changed and not removed:
+            return
+        await asyncio.to_thread(self._write_bot_data, changed, removed)
+        self._bot_blobs = current
+
+    async def update_callback_data(self, data: Any) -> None:
+        blob = _dumps(data)
+        if self._callback_blob == blob:
+            return
+        await asyncio.to_thread(self._write, "INSERT OR REPLACE INTO callback_data (id, data) VALUES (0, ?)", (blob,))
+        self._callback_blob = blob
+
+    async def drop_user_data(self, user_id: int) -> None:
+        await asyncio.to_thread(self._write, "DELETE FROM user_data WHERE user_id = ?", (user_id,))
+        self._user_blobs.pop(user_id, None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        await asyncio.to_thread(self._write, "DELETE FROM chat_data WHERE chat_id = ?", (chat_id,))
+        self._chat_blobs.pop(chat_id, None)
+
+    # The in-memory data is always authoritative, so there is nothing to refresh.
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def flush(self) -> None:
+        # Every update is committed immediately; flushing only releases the connection.
+        await asyncio.to_thread(self._close)
@@ -6,6 +6,7 @@ import asyncio
 import logging
 import time
 import os
+from datetime import datetime
 from telegram.ext import Application
 from telegram.error import Forbidden
 import src.config as config
@@ -14,6 +15,9 @@ from src import services
 
 logger = logging.getLogger(__name__)
 
+HEALTH_CHECK_INTERVAL = 60 # seconds between probes while no failures are reported
+UNBLOCK_MAX_SLEEP = 300 # upper bound so blocks added while sleeping are still picked up
+
 async def performance_report_task():
     """Periodically exports performance metrics to a JSON file."""
     while True:
@@ -24,7 +28,12 @@ async def performance_report_task():
                 logger.info("Performance report task is stopping.")
                 break
 
-            date_str = time.strftime("%Y-%m-%d_%H-%M-%S")
+            # Nothing was completed since the last export, so skip writing an identical report.
+            if not services.monitoring.has_new_performance_samples():
+                logger.debug("No new performance samples since the last report; skipping export.")
+                continue
+
+            date_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
             report_path = os.path.join(config.LOGS_DIR, f"performance_report_{date_str}.json")
             await services.monitoring.export_performance_report(report_path)
         except Exception as e:
@@ -57,10 +66,14 @@ async def health_check_task(application: Application):
 
     while True:
         try:
-            await asyncio.sleep(60) # Check every minute
+            # Wake up early if a chat request has just failed against the AI server.
+            await asyncio.wait_for(services.ai_models.health_check_requested.wait(), timeout=HEALTH_CHECK_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
         except asyncio.CancelledError:
             logger.info("Health check task is stopping.")
             break
+        services.ai_models.health_check_requested.clear()
 
         try:
             previous_status = application.bot_data.get('ai_service_online', False)
@@ -80,20 +93,36 @@ async def health_check_task(application: Application):
         except Exception as e:
             logger.warning(f"Failed to check AI model connection: {e}", exc_info=True)
 
+async def embedder_warmup_task():
+    """Loads the embedding model in a worker thread so the first message does not pay for it."""
+    try:
+        await asyncio.to_thread(services.database.warmup_embedder)
+    except asyncio.CancelledError:
+        # The thread cannot be interrupted; the load simply finishes unobserved.
+        logger.info("Embedder warmup task is stopping.")
+
 async def unblock_users_task(application: Application):
-    """Periodically checks for and removes expired timed blocks."""
+    """Removes expired timed blocks, sleeping until the next one is due."""
     while True:
+        delay = UNBLOCK_MAX_SLEEP
+        try:
+            next_unblock = await services.database.get_next_unblock_time()
+            if next_unblock is not None:
+                delay = min(max(next_unblock - time.time(), 1.0), UNBLOCK_MAX_SLEEP)
+        except asyncio.CancelledError:
+            logger.info("Unblock users task is stopping.")
+            break
+        except Exception as e:
+            logger.error(f"Failed to look up the next timed unblock: {e}", exc_info=True)
+
         try:
-            await asyncio.sleep(300) # Check every 5 minutes
+            await asyncio.sleep(delay)
         except asyncio.CancelledError:
             logger.info("Unblock users task is stopping.")
             break
 
         try:
-            users_to_unblock = await services.database.get_timed_unblocks()
-            if users_to_unblock:
-                for user_id in users_to_unblock:
-                    await services.database.unblock_user_by_id(user_id)
-                    logger.info(f"Automatically unblocked user {user_id} due to timed block expiration.")
+            for user_id in await services.database.sweep_timed_unblocks():
+                logger.info(f"Automatically unblocked user {user_id} due to timed block expiration.")
         except Exception as e:
             logger.error(f"Error in unblock users task: {e}", exc_info=True)
\ No newline at end of file
@@ -7,6 +7,7 @@ import logging
 import asyncio
 import time # For timed blocks
 from datetime import timedelta, datetime # For formatting timed blocks
+from typing import Optional, Tuple
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
@@ -18,7 +19,10 @@ from telegram.ext import (
     ConversationHandler,
 )
 from telegram.constants import ParseMode
+from telegram.error import BadRequest
 import html
+import re
+from functools import lru_cache, wraps
 
 import src.config as config
 from src.utils import files as file_utils
@@ -27,6 +31,8 @@ from src.services import monitoring as monitoring_service
 from src.services import database as db_service # Import for blocklist
 from src.utils.files import load_json, save_json
 from src.utils import logging as logging_utils
+from src.utils.background import run_in_background
+from src.utils.formatting import format_timestamp
 
 import os
 
@@ -38,60 +44,193 @@ EDITING_MOTD = range(1)
 # --- Persistence file for toggles ---
 TOGGLES_FILE = os.path.join(config.DATA_DIR, "admin_toggles.json")
 
+# Resolved once for the reload log lines; the configured paths do not change at runtime.
+_PERSONAS_ABS = os.path.abspath(config.PERSONAS_PATH)
+_SCENERIES_ABS = os.path.abspath(config.SCENERIES_PATH)
+
+TOGGLES_SAVE_DELAY = 0.5 # seconds; rapid toggle presses are coalesced into one write
+_toggles_flush_task: Optional[asyncio.Task] = None
+# Set on every toggle change, cleared when a write takes its snapshot; the writer loops until it stays clear.
+_toggles_dirty = False
+# Serializes writes, which share save_json's fixed temporary file.
+_toggles_write_lock = asyncio.Lock()
+# Toggle values as last loaded from or written to disk; a write that would not change them is skipped.
+_last_saved_toggles: Optional[dict] = None
+
 def load_admin_toggles():
+    global _last_saved_toggles
     data = load_json(TOGGLES_FILE, default={})
-    return {
+    toggles = {
         "streaming_enabled": data.get("streaming_enabled", False),
         "vector_memory_enabled": data.get("vector_memory_enabled", config.VECTOR_MEMORY_ENABLED)
     }
+    _last_saved_toggles = dict(toggles)
+    return toggles
+
+async def _write_admin_toggles(bot_data):
+    global _last_saved_toggles, _toggles_dirty
+    async with _toggles_write_lock:
+        _toggles_dirty = False
+        data = {
+            "streaming_enabled": bot_data.get('streaming_enabled', False),
+            "vector_memory_enabled": bot_data.get('vector_memory_enabled', config.VECTOR_MEMORY_ENABLED)
+        }
+        if data == _last_saved_toggles:
+            return
+        # save_json writes to a temporary file and os.replace()s it, so the file is never left partial.
+        if await asyncio.to_thread(save_json, TOGGLES_FILE, data):
+            _last_saved_toggles = data
+
+async def _write_admin_toggles_later(bot_data):
+    # A press that lands while a write is in flight sets the flag again and gets its own write.
+    while _toggles_dirty:
+        await asyncio.sleep(TOGGLES_SAVE_DELAY)
+        await _write_admin_toggles(bot_data)
 
 def save_admin_toggles(context):
-    data = {
-        "streaming_enabled": context.bot_data.get('streaming_enabled', False),
-        "vector_memory_enabled": context.bot_data.get('vector_memory_enabled', config.VECTOR_MEMORY_ENABLED)
-    }
-    save_json(TOGGLES_FILE, data)
+    """Marks the toggles dirty and schedules a debounced write, off the event loop."""
+    global _toggles_flush_task, _toggles_dirty
+    _toggles_dirty = True
+    if _toggles_flush_task is None or _toggles_flush_task.done():
+        _toggles_flush_task = context.application.create_task(_write_admin_toggles_later(context.bot_data))
+
+async def flush_admin_toggles(bot_data):
+    """Writes any unsaved toggle change immediately. Called on shutdown."""
+    global _toggles_flush_task
+    task, _toggles_flush_task = _toggles_flush_task, None
+    if task is not None and not task.done():
+        # Cancelling would not stop a write already running in a worker thread, so let it finish.
+        try:
+            await task
+        except Exception as e:
+            logger.error(f"Pending admin toggle write failed: {e}")
+    await _write_admin_toggles(bot_data)
 
 def owner_only(func):
     """Decorator to restrict access to bot owner, with user feedback and logging."""
+    @wraps(func)
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+        user = update.effective_user
+        # Owner requests take a single int comparison; BOT_OWNER_ID is None only when misconfigured.
+        if user is not None and user.id == config.BOT_OWNER_ID:
+            return await func(update, context, *args, **kwargs)
+
+        message, query = update.message, update.callback_query
         if config.BOT_OWNER_ID is None:
             logger.error("BOT_OWNER_ID is not set in config. Admin commands are disabled.")
-            if getattr(update, 'message', None):
-                await update.message.reply_text("❌ Admin commands are not configured. Please set BOT_OWNER_ID.")
-            elif getattr(update, 'callback_query', None):
-                await update.callback_query.answer("❌ Admin commands not configured.", show_alert=True)
+            if message:
+                await message.reply_text("❌ Admin commands are not configured. Please set BOT_OWNER_ID.")
+            elif query:
+                await query.answer("❌ Admin commands not configured.", show_alert=True)
             return
 
-        if update.effective_user.id != config.BOT_OWNER_ID:
-            logger.warning(
-                f"Unauthorized admin access attempt by user {update.effective_user.id} ({update.effective_user.username}). "
-                f"Command/Callback: {update.effective_message.text if update.effective_message else update.callback_query.data}"
-            )
-            if getattr(update, 'message', None):
-                await update.message.reply_text("❌ You are not authorized to use this command.")
-            elif getattr(update, 'callback_query', None):
-                await update.callback_query.answer("❌ Access denied.", show_alert=True)
-            return
+        logger.warning(
+            f"Unauthorized admin access attempt by user {user.id if user else None} ({user.username if user else None}). "
+            f"Command/Callback: {update.effective_message.text if update.effective_message else query.data if query else None}"
+        )
+        if message:
+            await message.reply_text("❌ You are not authorized to use this command.")
+        elif query:
+            await query.answer("❌ Access denied.", show_alert=True)
+    return wrapper
+
+def _ulog(update: Update) -> logging.Logger:
+    """Returns the per-user conversation logger for the update's sender."""
+    user = update.effective_user
+    return logging_utils.get_user_logger(user.id, user.username)
+
+def logs_interaction(func):
+    """
+    Decorator that writes the triggering button press or command to the user's log.
+    The LOG_USER_* flags are fixed at startup, so with both off the handler is returned unwrapped.
+    """
+    if not (config.LOG_USER_UI_INTERACTIONS or config.LOG_USER_COMMANDS):
+        return func
+
+    @wraps(func)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+        query = update.callback_query
+        if query is not None:
+            if config.LOG_USER_UI_INTERACTIONS:
+                _ulog(update).info(f"UI_INTERACTION: Pressed button with data '{query.data}'")
+        elif config.LOG_USER_COMMANDS and update.effective_message:
+            _ulog(update).info(f"COMMAND: {update.effective_message.text}")
         return await func(update, context, *args, **kwargs)
     return wrapper
 
+def _answer_in_background(context: ContextTypes.DEFAULT_TYPE, query):
+    """
+    Acknowledges a callback query without waiting for the round trip, so the
+    handler's own work overlaps with it and the client spinner stops sooner.
+    """
+    run_in_background(context.application, query.answer(), "callback query answer")
+
+def _notify_user_in_background(context: ContextTypes.DEFAULT_TYPE, user_id: int, text: str, kind: str):
+    """Sends a block/unblock notice to the affected user without delaying the admin's reply."""
+    run_in_background(
+        context.application,
+        context.bot.send_message(chat_id=user_id, text=text),
+        f"{kind} notification to user {user_id}",
+        level=logging.WARNING,
+    )
+
+# Rejects non-owner updates in the dispatcher, before a handler coroutine is even
+# scheduled. With no BOT_OWNER_ID configured it matches nobody.
+OWNER_FILTER = filters.User(user_id=config.BOT_OWNER_ID)
+# Built once at import; the MOTD text state accepts only the owner's plain messages.
+_OWNER_TEXT_NOT_COMMAND = filters.TEXT & ~filters.COMMAND & OWNER_FILTER
+
 # --- Helper Functions for Formatting ---
+STATUS_TEXT_TTL = 2.0 # seconds; bursts of "System Status" presses share one sample
+PERFORMANCE_TEXT_TTL = 1.0
+_status_text_cache: Optional[Tuple[float, str]] = None
+_status_text_lock = asyncio.Lock()
+_performance_text_cache: Optional[Tuple[float, str]] = None
+
 def _get_performance_text(context: ContextTypes.DEFAULT_TYPE) -> str:
+    global _performance_text_cache
+    now = time.monotonic()
+    if _performance_text_cache and now - _performance_text_cache[0] < PERFORMANCE_TEXT_TTL:
+        return _performance_text_cache[1]
+    text = _build_performance_text()
+    _performance_text_cache = (now, text)
+    return text
+
+_PERF_TMPL = (
+    "<b>📊 Performance Metrics</b>\n\n"
+    "<b>Uptime:</b> {uptime}\n"
+    "<b>Completed Requests:</b> {completed_requests}\n"
+    "<b>Success Rate:</b> {success_rate:.2%}\n"
+    "<b>Avg. Response Time:</b> {average_response_time:.2f}s\n"
+    "<b>Requests Per Minute:</b> {rpm:.2f}\n"
+    "<b>Active/Total Users:</b> {active_users_1h} / {total_users_seen}"
+)
+
+def _build_performance_text() -> str:
     stats = monitoring_service.performance_monitor.get_overall_stats()
-    uptime_delta = timedelta(seconds=int(stats.get('uptime_seconds', 0)))
-    rpm = (stats.get('completed_requests', 0) / max(stats.get('uptime_seconds', 1), 1)) * 60
-    return (
-        f"<b>📊 Performance Metrics</b>\n\n"
-        f"<b>Uptime:</b> {str(uptime_delta)}\n"
-        f"<b>Completed Requests:</b> {stats.get('completed_requests', 0)}\n"
-        f"<b>Success Rate:</b> {stats.get('success_rate', 1.0):.2%}\n"
-        f"<b>Avg. Response Time:</b> {stats.get('average_response_time', 0):.2f}s\n"
-        f"<b>Requests Per Minute:</b> {rpm:.2f}\n"
-        f"<b>Active/Total Users:</b> {stats.get('active_users_1h', 0)} / {stats.get('total_users_seen', 0)}"
-    )
+    uptime_seconds = stats.get('uptime_seconds', 0)
+    completed_requests = stats.get('completed_requests', 0)
+    return _PERF_TMPL.format_map({
+        'uptime': str(timedelta(seconds=int(uptime_seconds))),
+        'completed_requests': completed_requests,
+        'success_rate': stats.get('success_rate', 1.0),
+        'average_response_time': stats.get('average_response_time', 0),
+        'rpm': (completed_requests / max(stats.get('uptime_seconds', 1), 1)) * 60,
+        'active_users_1h': stats.get('active_users_1h', 0),
+        'total_users_seen': stats.get('total_users_seen', 0),
+    })
 
 async def _get_status_text() -> str:
+    global _status_text_cache
+    # The lock makes simultaneous presses wait for one sample instead of each taking their own.
+    async with _status_text_lock:
+        if _status_text_cache and time.monotonic() - _status_text_cache[0] < STATUS_TEXT_TTL:
+            return _status_text_cache[1]
+        text = await _build_status_text()
+        _status_text_cache = (time.monotonic(), text)
+        return text
+
+async def _build_status_text() -> str:
     ai_online = await ai_service.is_service_online()
     metrics = monitoring_service.get_system_metrics()
     status_msg = (
@@ -105,11 +244,28 @@ async def _get_status_text() -> str:
     return status_msg
 
 # --- Menu Display Functions ---
-async def _display_admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Shows the main admin panel, editing the message if it's from a callback."""
-    streaming_enabled = context.bot_data.get('streaming_enabled', False)
-    vector_mem_enabled = context.bot_data.get('vector_memory_enabled', config.VECTOR_MEMORY_ENABLED)
+async def _edit_menu_message(message, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None, parse_mode: Optional[str] = ParseMode.HTML):
+    """
+    Edits a menu message, skipping the API call when it already shows the same
+    text and keyboard (Telegram would only reject it as "not modified").
+    """
+    current_text = message.text_html if parse_mode == ParseMode.HTML else message.text
+    if current_text == text and message.reply_markup == reply_markup:
+        return
+    try:
+        await message.edit_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+    except BadRequest as e:
+        if "Message is not modified" in str(e):
+            pass
+        else:
+            raise
+
+ADMIN_MENU_TEXT = "<b>👑 Admin Panel</b>"
+BACK_TO_ADMIN_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("« Back", callback_data="admin_menu_back")]])
 
+@lru_cache(maxsize=4)
+def _build_admin_menu_markup(streaming_enabled: bool, vector_mem_enabled: bool) -> InlineKeyboardMarkup:
+    """Builds the admin panel keyboard; there are only four toggle combinations, so each is built once."""
     buttons = [
         [InlineKeyboardButton("📊 Performance", callback_data="admin_performance"), InlineKeyboardButton("📡 System Status", callback_data="admin_status")],
         [InlineKeyboardButton(f"💨 AI Chat Streaming: {'ON' if streaming_enabled else 'OFF'}", callback_data="admin_toggle_streaming")],
@@ -118,167 +274,174 @@ async def _display_admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE
         [InlineKeyboardButton("🔄 Reload Files", callback_data="admin_reload")],
         [InlineKeyboardButton("🚫 Manage Blocklist", callback_data="admin_blocklist_menu")] # New: Blocklist menu
     ]
-    markup = InlineKeyboardMarkup(buttons)
-    text = "<b>👑 Admin Panel</b>"
+    return InlineKeyboardMarkup(buttons)
+
+async def _display_admin_menu(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    streaming_enabled: Optional[bool] = None,
+    vector_mem_enabled: Optional[bool] = None,
+):
+    """
+    Shows the main admin panel, editing the message if it's from a callback.
+    Toggle values left as None are read from bot_data.
+    """
+    if streaming_enabled is None:
+        streaming_enabled = context.bot_data.get('streaming_enabled', False)
+    if vector_mem_enabled is None:
+        vector_mem_enabled = context.bot_data.get('vector_memory_enabled', config.VECTOR_MEMORY_ENABLED)
+
+    markup = _build_admin_menu_markup(bool(streaming_enabled), bool(vector_mem_enabled))
+    text = ADMIN_MENU_TEXT
 
     if update.callback_query:
-        await update.callback_query.message.edit_text(text, reply_markup=markup, parse_mode=ParseMode.HTML)
+        await _edit_menu_message(update.callback_query.message, text, markup)
     else:
         if update.effective_message:
             await update.effective_message.reply_text(text, reply_markup=markup, parse_mode=ParseMode.HTML)
 
 # --- MOTD Sub-Conversation Handlers ---
+MOTD_CONFIRMATION_DELAY = 2 # seconds a confirmation stays visible before the panel returns
+
+async def _display_admin_menu_later(update: Update, context: ContextTypes.DEFAULT_TYPE, delay: float):
+    await asyncio.sleep(delay)
+    await _display_admin_menu(update, context)
+
 @owner_only
+@logs_interaction
 async def motd_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Displays the MOTD management sub-menu."""
-    if config.LOG_USER_UI_INTERACTIONS:
-        user_logger = logging_utils.get_user_logger(update.effective_user.id, update.effective_user.username)
-        user_logger.info(f"UI_INTERACTION: Pressed button with data '{update.callback_query.data}'")
-
     query = update.callback_query
-    await query.answer()
-    current_motd = context.bot_data.get('motd', 'Not currently set')
-    text = f"<b>📢 MOTD Management</b>\n\n<b>Current:</b>\n<i>{html.escape(current_motd)}</i>"
+    _answer_in_background(context, query)
+    bot_data = context.bot_data
+    current_motd_html = bot_data.get('motd_html')
+    if current_motd_html is None:
+        current_motd = bot_data.get('motd')
+        if current_motd is None:
+            current_motd_html = 'Not currently set'
+        else:
+            # MOTD set before the escaped copy was cached; fill it in once.
+            current_motd_html = bot_data['motd_html'] = html.escape(current_motd)
+    text = f"<b>📢 MOTD Management</b>\n\n<b>Current:</b>\n<i>{current_motd_html}</i>"
     buttons = [
         [InlineKeyboardButton("✍️ Edit", callback_data="admin_motd_edit"), InlineKeyboardButton("🗑️ Disable", callback_data="admin_motd_disable")],
         [InlineKeyboardButton("« Back", callback_data="admin_motd_cancel")]
     ]
-    await query.message.edit_text(text, reply_markup=InlineKeyboardMarkup(buttons), parse_mode=ParseMode.HTML)
+    await _edit_menu_message(query.message, text, InlineKeyboardMarkup(buttons))
     return EDITING_MOTD
 
-@owner_only
+@logs_interaction
 async def motd_prompt_edit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Asks the admin to send the new MOTD text."""
-    if config.LOG_USER_UI_INTERACTIONS:
-        user_logger = logging_utils.get_user_logger(update.effective_user.id, update.effective_user.username)
-        user_logger.info(f"UI_INTERACTION: Pressed button with data '{update.callback_query.data}'")
-
     query = update.callback_query
-    await query.answer()
+    _answer_in_background(context, query)
     await query.message.edit_text("Please send the new Message of the Day now.")
     return EDITING_MOTD
 
-@owner_only
 async def motd_receive_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Saves the new MOTD text and ends the sub-conversation."""
     if config.LOG_USER_COMMANDS: # Logged as a command/text input
-        user_logger = logging_utils.get_user_logger(update.effective_user.id, update.effective_user.username)
-        user_logger.info(f"UI_INPUT: Provided MOTD text.")
+        _ulog(update).info(f"UI_INPUT: Provided MOTD text.")
 
-    context.bot_data['motd'] = update.message.text
+    motd_text = update.message.text
+    bot_data = context.bot_data
+    bot_data['motd'] = motd_text
+    # Escaped once here rather than every time the MOTD menu is opened.
+    bot_data['motd_html'] = html.escape(motd_text)
     await update.message.reply_text("✅ New MOTD has been set.")
     await _display_admin_menu(update, context)
     return ConversationHandler.END
 
-@owner_only
+@logs_interaction
 async def motd_disable(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Disables the MOTD and ends the sub-conversation."""
-    if config.LOG_USER_UI_INTERACTIONS:
-        user_logger = logging_utils.get_user_logger(update.effective_user.id, update.effective_user.username)
-        user_logger.info(f"UI_INTERACTION: Pressed button with data '{update.callback_query.data}'")
-
     query = update.callback_query
-    await query.answer()
-    context.bot_data.pop('motd', None)
+    _answer_in_background(context, query)
+    bot_data = context.bot_data
+    bot_data.pop('motd', None)
+    bot_data.pop('motd_html', None)
     await query.message.edit_text("✅ MOTD has been disabled.")
-    await asyncio.sleep(2)
-    await _display_admin_menu(update, context)
+    # Show the confirmation briefly, then bring the panel back without holding this handler.
+    context.application.create_task(_display_admin_menu_later(update, context, MOTD_CONFIRMATION_DELAY), update=update)
     return ConversationHandler.END
 
-@owner_only
+@logs_interaction
 async def motd_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Returns to the main admin menu from the MOTD sub-menu."""
-    if update.callback_query and config.LOG_USER_UI_INTERACTIONS:
-        user_logger = logging_utils.get_user_logger(update.effective_user.id, update.effective_user.username)
-        user_logger.info(f"UI_INTERACTION: Pressed button with data '{update.callback_query.data}'")
-    elif update.message and config.LOG_USER_COMMANDS:
-        user_logger = logging_utils.get_user_logger(update.effective_user.id, update.effective_user.username)
-        user_logger.info(f"COMMAND: {update.message.text}")
-
     if update.callback_query:
-        await update.callback_query.answer()
+        _answer_in_background(context, update.callback_query)
 
     await _display_admin_menu(update, context)
     return ConversationHandler.END
 
 # --- Main Admin Panel Handlers ---
-@owner_only
+@logs_interaction
 async def admin_menu_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Entry point for the /admin command."""
-    if config.LOG_USER_COMMANDS:
-        user_logger = logging_utils.get_user_logger(update.effective_user.id, update.effective_user.username)
-        user_logger.info(f"COMMAND: {update.effective_message.text}")
-
     await _display_admin_menu(update, context)
 
+async def _toggle_streaming(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    bot_data = context.bot_data
+    streaming_enabled = not bot_data.get('streaming_enabled', False)
+    bot_data['streaming_enabled'] = streaming_enabled
+    save_admin_toggles(context)
+    await _display_admin_menu(update, context, streaming_enabled=streaming_enabled)
+
+async def _toggle_vector_memory(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    bot_data = context.bot_data
+    vector_mem_enabled = not bot_data.get('vector_memory_enabled', config.VECTOR_MEMORY_ENABLED)
+    bot_data['vector_memory_enabled'] = vector_mem_enabled
+    save_admin_toggles(context)
+    await _display_admin_menu(update, context, vector_mem_enabled=vector_mem_enabled)
+
+async def _reload_from_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await reload_command(update, context, from_callback=True)
+
+async def _show_performance(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    text = _get_performance_text(context)
+    await _edit_menu_message(update.callback_query.message, text, BACK_TO_ADMIN_MARKUP)
+
+async def _show_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    text = await _get_status_text()
+    await _edit_menu_message(update.callback_query.message, text, BACK_TO_ADMIN_MARKUP)
+
 @owner_only
+@logs_interaction
 async def admin_menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Dispatcher for the main admin menu buttons."""
-    if config.LOG_USER_UI_INTERACTIONS:
-        user_logger = logging_utils.get_user_logger(update.effective_user.id, update.effective_user.username)
-        user_logger.info(f"UI_INTERACTION: Pressed button with data '{update.callback_query.data}'")
-
     query = update.callback_query
-    await query.answer()
-    action = query.data
-
-    if action == "admin_toggle_streaming":
-        context.bot_data['streaming_enabled'] = not context.bot_data.get('streaming_enabled', False)
-        save_admin_toggles(context)
-        await _display_admin_menu(update, context)
-    elif action == "admin_toggle_vector":
-        context.bot_data['vector_memory_enabled'] = not context.bot_data.get('vector_memory_enabled', config.VECTOR_MEMORY_ENABLED)
-        save_admin_toggles(context)
-        await _display_admin_menu(update, context)
-    elif action == "admin_reload":
-        await reload_command(update, context, from_callback=True)
-    elif action == "admin_performance":
-        text = _get_performance_text(context)
-        buttons = [[InlineKeyboardButton("« Back", callback_data="admin_menu_back")]]
-        await query.message.edit_text(text, reply_markup=InlineKeyboardMarkup(buttons), parse_mode=ParseMode.HTML)
-    elif action == "admin_status":
-        text = await _get_status_text()
-        buttons = [[InlineKeyboardButton("« Back", callback_data="admin_menu_back")]]
-        await query.message.edit_text(text, reply_markup=InlineKeyboardMarkup(buttons), parse_mode=ParseMode.HTML)
-    elif action == "admin_blocklist_menu":
-        await list_blocked_users(update, context) # Direct to blocklist view
-    elif action == "admin_menu_back":
-        await _display_admin_menu(update, context)
+    _answer_in_background(context, query)
 
-@owner_only
+    action_handler = _ADMIN_ACTIONS.get(query.data)
+    if action_handler:
+        await action_handler(update, context)
+
+@logs_interaction
 async def reload_command(update: Update, context: ContextTypes.DEFAULT_TYPE, from_callback: bool = False):
     """Reloads personas and sceneries from files."""
-    if from_callback and config.LOG_USER_UI_INTERACTIONS:
-        user_logger = logging_utils.get_user_logger(update.effective_user.id, update.effective_user.username)
-        user_logger.info(f"UI_INTERACTION: Pressed button with data 'admin_reload'")
-    elif not from_callback and config.LOG_USER_COMMANDS:
-         user_logger = logging_utils.get_user_logger(update.effective_user.id, update.effective_user.username)
-         user_logger.info(f"COMMAND: {update.effective_message.text}")
-
     message_target = update.callback_query.message if from_callback else update.message
     await message_target.reply_text("⏳ Reloading ...")
     try:
-        personas_path_resolved = os.path.abspath(config.PERSONAS_PATH)
-        sceneries_path_resolved = os.path.abspath(config.SCENERIES_PATH)
-        logger.info(f"Reloading personas from: {personas_path_resolved}")
-        logger.info(f"Reloading sceneries from: {sceneries_path_resolved}")
-        context.bot_data['personas'] = file_utils.load_from_directory(config.PERSONAS_PATH, key_name="name")
-        sceneries_data = file_utils.load_from_directory(config.SCENERIES_PATH, key_name="name")
-        context.bot_data['sceneries_full_data'] = sceneries_data
-        context.bot_data['sceneries'] = { name: data.get('description', '') for name, data in sceneries_data.items() }
-        msg = f"✅ Reload complete: {len(context.bot_data['personas'])} personas, {len(context.bot_data['sceneries'])} sceneries."
+        logger.info(f"Reloading personas from: {_PERSONAS_ABS}")
+        logger.info(f"Reloading sceneries from: {_SCENERIES_ABS}")
+        personas, sceneries_data = await asyncio.gather(
+            file_utils.load_from_directory_async(config.PERSONAS_PATH, key_name="name"),
+            file_utils.load_from_directory_async(config.SCENERIES_PATH, key_name="name"),
+        )
+        bot_data = context.bot_data
+        bot_data['personas'] = personas
+        bot_data['sceneries_full_data'] = sceneries_data
+        bot_data['sceneries'] = { name: data.get('description', '') for name, data in sceneries_data.items() }
+        msg = f"✅ Reload complete: {len(personas)} personas, {len(sceneries_data)} sceneries."
         logger.info(msg)
     except Exception as e:
         logger.error(f"Error during /reload: {e}", exc_info=True)
         msg = f"❌ An error occurred during reload: {html.escape(str(e))}"
     await message_target.reply_text(msg)
 
-@owner_only
+@logs_interaction
 async def block_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Blocks a user, optionally with a duration and reason."""
-    user_logger = logging_utils.get_user_logger(update.effective_user.id, update.effective_user.username)
-    user_logger.info(f"COMMAND: {update.effective_message.text}")
-
     if not context.args:
         await update.message.reply_text("Usage: `/block <user_id> [duration_hours] [reason]`\nDuration is optional. Reason is optional.", parse_mode=ParseMode.MARKDOWN)
         return
@@ -312,33 +475,29 @@ async def block_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     try:
         await db_service.add_blocked_user(target_user_id, blocked_until, reason)
-        block_duration_text = f" until {datetime.fromtimestamp(blocked_until).strftime('%Y-%m-%d %H:%M:%S CEST')}" if blocked_until else " permanently"
+        until_text = format_timestamp(datetime.fromtimestamp(blocked_until)) if blocked_until else None
+        block_duration_text = f" until {until_text}" if until_text else " permanently"
         block_reason_text = f" (Reason: {reason})" if reason else ""
         await update.message.reply_text(f"✅ User `{target_user_id}` has been blocked{block_duration_text}{block_reason_text}.", parse_mode=ParseMode.MARKDOWN)
         logger.info(f"Admin {update.effective_user.id} blocked user {target_user_id}{block_duration_text}{block_reason_text}.")
 
-        # Notify the blocked user if possible
-        try:
-            unblock_info = f"This block is permanent." if blocked_until is None else f"You will be unblocked on {datetime.fromtimestamp(blocked_until).strftime('%Y-%m-%d %H:%M:%S CEST')}."
-            reason_info = f"Reason: {reason}" if reason else "No specific reason provided."
-            await context.bot.send_message(
-                chat_id=target_user_id,
-                text=f"🚫 You have been blocked from interacting with this bot.\n\n{reason_info}\n{unblock_info}"
-            )
-        except Exception as e:
-            logger.warning(f"Could not send block notification to user {target_user_id}: {e}")
+        # Notify the blocked user if possible, without holding up the admin's reply
+        unblock_info = f"This block is permanent." if until_text is None else f"You will be unblocked on {until_text}."
+        reason_info = f"Reason: {reason}" if reason else "No specific reason provided."
+        _notify_user_in_background(
+            context, target_user_id,
+            f"🚫 You have been blocked from interacting with this bot.\n\n{reason_info}\n{unblock_info}",
+            "block",
+        )
 
     except Exception as e:
         logger.error(f"Error blocking user {target_user_id}: {e}", exc_info=True)
         await update.message.reply_text(f"❌ An error occurred while blocking user `{target_user_id}`: {html.escape(str(e))}", parse_mode=ParseMode.HTML)
 
 
-@owner_only
+@logs_interaction
 async def unblock_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Unblocks a user."""
-    user_logger = logging_utils.get_user_logger(update.effective_user.id, update.effective_user.username)
-    user_logger.info(f"COMMAND: {update.effective_message.text}")
-
     if not context.args:
         await update.message.reply_text("Usage: `/unblock <user_id>`", parse_mode=ParseMode.MARKDOWN)
         return
@@ -355,13 +514,11 @@ async def unblock_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await db_service.remove_blocked_user(target_user_id)
             await update.message.reply_text(f"✅ User `{target_user_id}` has been unblocked.", parse_mode=ParseMode.MARKDOWN)
             logger.info(f"Admin {update.effective_user.id} unblocked user {target_user_id}.")
-            try:
-                await context.bot.send_message(
-                    chat_id=target_user_id,
-                    text="✅ You have been unblocked and can now interact with the bot again."
-                )
-            except Exception as e:
-                logger.warning(f"Could not send unblock notification to user {target_user_id}: {e}")
+            _notify_user_in_background(
+                context, target_user_id,
+                "✅ You have been unblocked and can now interact with the bot again.",
+                "unblock",
+            )
         else:
             await update.message.reply_text(f"ℹ️ User `{target_user_id}` is not currently blocked.", parse_mode=ParseMode.MARKDOWN)
     except Exception as e:
@@ -369,72 +526,90 @@ async def unblock_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"❌ An error occurred while unblocking user `{target_user_id}`: {html.escape(str(e))}", parse_mode=ParseMode.HTML)
 
 
-@owner_only
+@logs_interaction
 async def list_blocked_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Lists all currently blocked users."""
-    user_logger = logging_utils.get_user_logger(update.effective_user.id, update.effective_user.username)
     if update.callback_query:
-        user_logger.info(f"UI_INTERACTION: Pressed button with data '{update.callback_query.data}'")
-        await update.callback_query.answer()
-    else:
-        user_logger.info(f"COMMAND: {update.effective_message.text}")
+        _answer_in_background(context, update.callback_query)
 
     blocked_users = await db_service.get_all_blocked_users()
 
     if not blocked_users:
         text = "✅ No users are currently blocked."
     else:
-        text = "<b>🚫 Currently Blocked Users:</b>\n\n"
+        lines = ["<b>🚫 Currently Blocked Users:</b>", ""]
+        now = datetime.now()
         for user_id, blocked_until, reason in blocked_users:
             until_text = ""
             if blocked_until is not None:
                 until_dt = datetime.fromtimestamp(blocked_until)
-                if until_dt > datetime.now():
-                    until_text = f" (Until: {until_dt.strftime('%Y-%m-%d %H:%M:%S CEST')})"
+                if until_dt > now:
+                    until_text = f" (Until: {format_timestamp(until_dt)})"
                 else:
                     # Should be cleaned by unblock task, but show as expired if still listed
                     until_text = " (Expired)"
             reason_text = f" - Reason: {reason}" if reason else ""
-            text += f"• `{user_id}`{until_text}{reason_text}\n"
+            lines.append(f"• `{user_id}`{until_text}{reason_text}")
+        text = "\n".join(lines) + "\n"
 
     buttons = [[InlineKeyboardButton("« Back to Admin Panel", callback_data="admin_menu_back")]]
     markup = InlineKeyboardMarkup(buttons)
 
     if update.callback_query:
-        await update.callback_query.message.edit_text(text, reply_markup=markup, parse_mode=ParseMode.HTML)
+        await _edit_menu_message(update.callback_query.message, text, markup)
     else:
         await update.message.reply_html(text, reply_markup=markup)
 
+# Main admin panel buttons, keyed by callback data. The dispatcher's pattern is built from these keys.
+_ADMIN_ACTIONS = {
+    "admin_toggle_streaming": _toggle_streaming,
+    "admin_toggle_vector": _toggle_vector_memory,
+    "admin_reload": _reload_from_panel,
+    "admin_performance": _show_performance,
+    "admin_status": _show_status,
+    "admin_blocklist_menu": list_blocked_users, # Direct to blocklist view
+    "admin_menu_back": _display_admin_menu,
+}
+# Compiled once; callback data is ASCII, and \Z rejects a trailing newline that $ would allow.
+ADMIN_ACTION_PATTERN = re.compile(f"^(?:{'|'.join(map(re.escape, _ADMIN_ACTIONS))})\\Z", re.ASCII)
+MOTD_MENU_PATTERN = re.compile(r"^admin_motd_menu\Z", re.ASCII)
+MOTD_EDIT_PATTERN = re.compile(r"^admin_motd_edit\Z", re.ASCII)
+MOTD_DISABLE_PATTERN = re.compile(r"^admin_motd_disable\Z", re.ASCII)
+MOTD_CANCEL_PATTERN = re.compile(r"^admin_motd_cancel\Z", re.ASCII)
+
 def register(application: Application):
     """Registers all admin-related handlers."""
 
     motd_conv = ConversationHandler(
-        entry_points=[CallbackQueryHandler(motd_menu_handler, pattern="^admin_motd_menu$")],
+        entry_points=[CallbackQueryHandler(motd_menu_handler, pattern=MOTD_MENU_PATTERN)],
         states={
             EDITING_MOTD: [
-                CallbackQueryHandler(motd_prompt_edit, pattern="^admin_motd_edit$"),
-                CallbackQueryHandler(motd_disable, pattern="^admin_motd_disable$"),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, motd_receive_text)
+                CallbackQueryHandler(motd_prompt_edit, pattern=MOTD_EDIT_PATTERN),
+                CallbackQueryHandler(motd_disable, pattern=MOTD_DISABLE_PATTERN),
+                MessageHandler(_OWNER_TEXT_NOT_COMMAND, motd_receive_text)
             ]
         },
         fallbacks=[
-            CallbackQueryHandler(motd_cancel, pattern="^admin_motd_cancel$"),
-            CommandHandler('cancel', motd_cancel)
+            CallbackQueryHandler(motd_cancel, pattern=MOTD_CANCEL_PATTERN),
+            CommandHandler('cancel', motd_cancel, filters=OWNER_FILTER)
         ],
         per_user=True,
         per_chat=True,
-        persistent=True,
-        name="motd_conversation_handler"
+        # Kept in memory only: a restart simply drops an unfinished MOTD edit.
+        persistent=False,
     )
 
     admin_panel_dispatcher = CallbackQueryHandler(
         admin_menu_callback,
-        pattern="^admin_(toggle_streaming|toggle_vector|reload|performance|status|menu_back|blocklist_menu)$"
+        pattern=ADMIN_ACTION_PATTERN,
+        block=False,
     )
 
-    application.add_handler(CommandHandler("admin", admin_menu_command))
-    application.add_handler(CommandHandler("block", block_user))
-    application.add_handler(CommandHandler("unblock", unblock_user))
-    application.add_handler(CommandHandler("blocklist", list_blocked_users))
+    # Admin work (reloads, status sampling, DB lookups) runs as its own task so it
+    # never holds up updates from other chats.
+    application.add_handler(CommandHandler("admin", admin_menu_command, filters=OWNER_FILTER, block=False))
+    application.add_handler(CommandHandler("block", block_user, filters=OWNER_FILTER, block=False))
+    application.add_handler(CommandHandler("unblock", unblock_user, filters=OWNER_FILTER, block=False))
+    application.add_handler(CommandHandler("blocklist", list_blocked_users, filters=OWNER_FILTER, block=False))
     application.add_handler(motd_conv)
     application.add_handler(admin_panel_dispatcher)
\ No newline at end of file
@@ -9,6 +9,7 @@ import asyncio
 import re
 import tiktoken
 from datetime import datetime
+from functools import lru_cache
 
 from telegram import Update, Message
 from telegram.ext import Application, MessageHandler, filters, ContextTypes
@@ -20,39 +21,45 @@ from src.services import database as db_service
 from src.services import ai_models as ai_service
 from src.services import monitoring as monitoring_service
 from src.utils import logging as logging_utils
+from src.utils.background import run_in_background
+from src.utils.formatting import format_timestamp
 
 logger = logging.getLogger(__name__)
 
-def count_message_tokens(messages: list[dict], model: str = "gpt-3.5-turbo") -> int:
-    """Returns the number of tokens used by a list of messages."""
+_TEXT_NOT_COMMAND = filters.TEXT & ~filters.COMMAND
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str) -> "tiktoken.Encoding":
+    """
+    Resolves the tokenizer for a model once per process. Local model names are unknown
+    to tiktoken, so without the cache every count would pay for a failed lookup first.
+    """
     try:
-        encoding = tiktoken.encoding_for_model(model)
+        return tiktoken.encoding_for_model(model)
     except KeyError:
-        encoding = tiktoken.get_encoding("cl100k_base")
+        return tiktoken.get_encoding("cl100k_base")
 
-    num_tokens = 0
+def _message_token_costs(messages: list[dict], model: str = "gpt-3.5-turbo") -> list[int]:
+    """
+    Returns each message's token cost: 4 per message plus its encoded fields, excluding
+    the reply priming. Meant to run in a worker thread, one call for a whole prompt.
+    """
+    encoding = _get_encoding(model)
+    costs = []
     for message in messages:
-        num_tokens += 4
+        cost = 4
         for key, value in message.items():
-            num_tokens += len(encoding.encode(value))
+            # Special-token text typed by a user is counted as plain text instead of raising.
+            cost += len(encoding.encode(value, disallowed_special=()))
             if key == "name":
-                num_tokens -= 1
-    num_tokens += 2
-    return num_tokens
-
-async def build_chat_context(context: ContextTypes.DEFAULT_TYPE, user_text: str) -> list:
-    """
-    Constructs the message list for the AI, ensuring it fits within the token limit.
-    """
-    chat_id = context.chat_data.get('chat_id', context.user_data.get('user_id'))
-
-    # --- Character & Persona Data ---
-    ai_persona_prompt = context.chat_data.get('persona_prompt', "You are a helpful AI assistant.")
-    user_name = context.user_data.get('user_display_name', 'user')
-    user_profile = context.user_data.get('user_profile', 'not specified')
+                cost -= 1
+        costs.append(cost)
+    return costs
 
+def _build_system_prompt(ai_persona_prompt: str, user_name: str, user_profile: str) -> str:
+    """Composes the role-play system prompt from the persona and the user's character."""
     # --- New, Unambiguous Prompt Structure ---
-    system_prompt = (
+    return (
         "This is a role-playing chat. You will act as your designated character and I, the user, will act as mine. You must follow all rules strictly.\n\n"
         "--- YOUR CHARACTER DOSSIER ---\n"
         f"{ai_persona_prompt}\n\n"
@@ -66,36 +73,95 @@ async def build_chat_context(context: ContextTypes.DEFAULT_TYPE, user_text: str)
         f"4.  **End Your Turn Correctly:** You must always end your turn by prompting the user for their action (e.g., 'What does {user_name} do?')."
     )
 
+async def build_chat_context(context: ContextTypes.DEFAULT_TYPE, user_text: str, user_name: str = 'user') -> list:
+    """
+    Constructs the message list for the AI, ensuring it fits within the token limit.
+    """
+    chat_data = context.chat_data
+    chat_id = chat_data.get('chat_id', context.user_data.get('user_id'))
+
+    # --- Character & Persona Data ---
+    ai_persona_prompt = chat_data.get('persona_prompt', "You are a helpful AI assistant.")
+    user_profile = context.user_data.get('user_profile', 'not specified')
+
+    # The system prompt only changes with the persona or the user's character, so it and
+    # its token cost are kept in chat_data and rebuilt only when one of its inputs changes.
+    prompt_key = (ai_persona_prompt, user_name, user_profile, config.CHAT_MODEL)
+    if chat_data.get('_system_prompt_key') == prompt_key:
+        system_prompt = chat_data['_system_prompt']
+        system_prompt_tokens = chat_data['_system_prompt_tokens']
+    else:
+        system_prompt = _build_system_prompt(ai_persona_prompt, user_name, user_profile)
+        system_prompt_tokens = None
+
     messages = [{"role": "system", "content": system_prompt}]
+    # Seed messages whose cost is cached are added to the running total directly; the rest are
+    # queued as (message, chat_data key prefix, cache key) to be counted with the history below.
+    current_tokens = 2
+    uncounted = []
+    if system_prompt_tokens is None:
+        uncounted.append((messages[0], '_system_prompt', prompt_key))
+    else:
+        current_tokens += system_prompt_tokens
 
-    # --- Memory and History Logic (remains the same) ---
+    # --- Memory and History Logic ---
+    # The semantic search and the history read are independent, so they run concurrently.
+    history_coro = db_service.get_history_from_db(chat_id, limit=50)
     if config.VECTOR_MEMORY_ENABLED:
-        relevant_memories = await db_service.search_semantic_memory(chat_id, user_text)
+        relevant_memories, history_with_ids = await asyncio.gather(
+            db_service.search_semantic_memory(chat_id, user_text), history_coro
+        )
         if relevant_memories:
             memory_prompt = "Relevant past events:\n- " + "\n- ".join(relevant_memories)
-            messages.append({"role": "system", "content": memory_prompt})
+            memory_message = {"role": "system", "content": memory_prompt}
+            messages.append(memory_message)
+            memory_key = (memory_prompt, config.CHAT_MODEL)
+            if chat_data.get('_memory_prompt_key') == memory_key:
+                current_tokens += chat_data['_memory_prompt_tokens']
+            else:
+                uncounted.append((memory_message, '_memory_prompt', memory_key))
+    else:
+        history_with_ids = await history_coro
 
-    current_tokens = count_message_tokens(messages, config.AI_PARAMS["chat"]["model"])
-    history_with_ids = await db_service.get_history_from_db(chat_id, limit=50)
     history_for_context = [{"role": msg["role"], "content": msg["content"]} for msg in history_with_ids]
 
+    # One worker-thread call counts the uncached seed messages and every history message (tiktoken
+    # releases the GIL while encoding); the loop below only adds integers.
+    costs = await asyncio.to_thread(
+        _message_token_costs, [message for message, _, _ in uncounted] + history_for_context, config.CHAT_MODEL
+    )
+    for (message, prefix, cache_key), cost in zip(uncounted, costs):
+        chat_data[f'{prefix}_key'] = cache_key
+        chat_data[f'{prefix}_tokens'] = cost
+        current_tokens += cost
+    if system_prompt_tokens is None:
+        chat_data['_system_prompt'] = system_prompt
+    history_costs = costs[len(uncounted):]
+
     final_history = []
-    for message in reversed(history_for_context):
-        message_tokens = count_message_tokens([message], config.AI_PARAMS["chat"]["model"])
+    for message, cost in zip(reversed(history_for_context), reversed(history_costs)):
+        message_tokens = cost + 2 # each message is budgeted with its own reply priming, as before
         if current_tokens + message_tokens < config.MAX_PROMPT_TOKENS:
-            final_history.insert(0, message)
+            final_history.append(message)
             current_tokens += message_tokens
         else:
             logger.debug(f"Token limit reached. Truncating conversation history for chat {chat_id}.")
             break
 
+    # Collected newest-first; restored to chronological order in one pass.
+    final_history.reverse()
     messages.extend(final_history)
 
     logger.debug(f"Final prompt for chat {chat_id} has {len(messages)} messages and {current_tokens} tokens.")
     return messages
 
+# Characters html.escape(quote=False) rewrites; most model output contains none of them.
+_HTML_UNSAFE_RE = re.compile(r"[&<>]")
+
 def sanitize_html(text: str) -> str:
     """Escapes HTML special characters to prevent formatting errors."""
+    if _HTML_UNSAFE_RE.search(text) is None:
+        return text
     return html.escape(text, quote=False)
 
 def safe_html_truncate(text: str, max_length: int, ellipsis: str = "...") -> str:
@@ -113,6 +179,11 @@ def safe_html_truncate(text: str, max_length: int, ellipsis: str = "...") -> str
     else:
         safe_length = max_length - len(ellipsis)
 
+    # Back off past a trailing partial entity (e.g. "&am"), which Telegram rejects.
+    entity_start = text.rfind('&', max(0, safe_length - 10), safe_length)
+    if entity_start != -1 and ';' not in text[entity_start:safe_length]:
+        safe_length = entity_start
+
     truncated_text = text[:safe_length] + ellipsis
 
     open_tags = re.findall(r'<([a-zA-Z]+)(?![^>]*?>)', truncated_text)
@@ -174,14 +245,17 @@ async def chat_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_text = message.text
 
     # --- Blocklist Check ---
-    blocked_info = await db_service.get_blocked_user(user.id)
+    # The rate-limit timestamp is fetched alongside, as both lookups are independent.
+    blocked_info, last_message_time = await asyncio.gather(
+        db_service.get_blocked_user(user.id), db_service.get_user_timestamp(user.id)
+    )
     if blocked_info:
         user_id, blocked_until, reason = blocked_info
         unblock_message = ""
         if blocked_until:
             unblock_dt = datetime.fromtimestamp(blocked_until)
             if unblock_dt > datetime.now():
-                unblock_message = f"You will be unblocked on {unblock_dt.strftime('%Y-%m-%d %H:%M:%S CEST')}."
+                unblock_message = f"You will be unblocked on {format_timestamp(unblock_dt)}."
             else:
                 # This case indicates the background task hasn't processed it yet.
                 # The user is still technically blocked in the DB.
@@ -200,69 +274,94 @@ async def chat_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # --- End Blocklist Check ---
 
 
-    user_name = context.user_data.get('user_display_name', 'user')
-
     if config.LOG_USER_CHAT_MESSAGES:
         user_logger = logging_utils.get_user_logger(user.id, user.username)
         user_logger.info(f"USER: {user_text}")
 
-    request_id = monitoring_service.performance_monitor.start_request(user_id=user.id, request_type="chat_message")
+    # Monitoring starts only once the message passes the rate limit, so spam is not measured.
+    request_id = None
     success = False
 
     try:
         context.chat_data['chat_id'] = update.effective_chat.id
 
-        last_message_time = await db_service.get_user_timestamp(user.id)
         if time.time() - last_message_time < config.USER_RATE_LIMIT:
             await message.reply_text("⏱️ Please wait a moment before sending another message.")
             return
 
+        request_id = monitoring_service.performance_monitor.start_request(user_id=user.id, request_type="chat_message")
         await db_service.update_user_timestamp(user.id, time.time())
 
-        if 'user_display_name' not in context.user_data:
+        try:
+            user_name = context.user_data['user_display_name']
+        except KeyError:
             await message.reply_text("Please run /start to set up your character profile first.")
             return
 
+        # Checked before any placeholder or typing action, so a rejected message costs one reply.
+        bot_data = context.bot_data
+        if not bot_data.get('ai_service_online', True):
+            await message.reply_text("❌ The AI service is currently offline. Please try again later.")
+            logger.warning(f"AI service reported offline, rejecting chat for user {user.id}.")
+            return
+
         placeholder = await message.reply_text("✍️...")
-        await context.bot.send_chat_action(chat_id=user.id, action=ChatAction.TYPING)
+        run_in_background(context.application, context.bot.send_chat_action(chat_id=user.id, action=ChatAction.TYPING), "typing action")
 
-        messages = await build_chat_context(context, user_text)
+        messages = await build_chat_context(context, user_text, user_name)
         messages.append({"role": "user", "content": user_text})
 
-        full_response_raw = ""
+        # Raw chunks are collected in a list and joined once, rather than grown with +=.
+        response_parts = []
 
-        if not context.bot_data.get('ai_service_online', True):
-            await placeholder.edit_text("❌ The AI service is currently offline. Please try again later.")
-            logger.warning(f"AI service reported offline, rejecting chat for user {user.id}.")
-            return
-
-        streaming_enabled = context.bot_data.get('streaming_enabled', False)
+        streaming_enabled = bot_data.get('streaming_enabled', False)
         if streaming_enabled:
-            sanitized_response_buffer = ""
+            # While streaming, the parts are joined and escaped only when an edit is due.
             last_edit_time = time.time()
+            # Edits also wait for enough new text, and are skipped when the visible text would not change.
+            chars_since_edit = 0
+            raw_len = 0
+            last_display_text = None
+            head_is_final = False
             response_generator = ai_service.get_chat_response(messages, stream=True)
             async for chunk in response_generator:
-                full_response_raw += chunk
-                sanitized_response_buffer += sanitize_html(chunk)
-
-                if time.time() - last_edit_time > config.STREAM_UPDATE_INTERVAL:
-                    display_text = sanitized_response_buffer + " ▋"
+                response_parts.append(chunk)
+                if head_is_final:
+                    continue # the visible head cannot change any more; the final edit follows the stream
+                raw_len += len(chunk)
+                chars_since_edit += len(chunk)
+
+                if chars_since_edit >= config.STREAM_MIN_EDIT_CHARS and time.time() - last_edit_time > config.STREAM_UPDATE_INTERVAL:
+                    # Only the head of the response fits in one message, so at most that much is escaped per edit.
+                    display_text = sanitize_html("".join(response_parts)[:TELEGRAM_MAX_MESSAGE_LENGTH]) + " ▋"
                     if len(display_text) > TELEGRAM_MAX_MESSAGE_LENGTH:
                         display_text = safe_html_truncate(display_text, TELEGRAM_MAX_MESSAGE_LENGTH - len(" ▋"), ellipsis="...") + " ▋"
 
-                    try:
-                        await placeholder.edit_text(display_text, parse_mode=ParseMode.HTML)
+                    if display_text == last_display_text:
+                        # Nothing visible changed; restart the throttle instead of rebuilding on every chunk.
                         last_edit_time = time.time()
-                    except BadRequest as e:
-                        logger.debug(f"BadRequest during message edit for user {user.id}: {e}")
-                        # Consider attempting to send the current buffer as a new message here if edit continually fails
-                        # For now, we'll just log and continue, as the error might be "message not modified"
-                        pass
+                        chars_since_edit = 0
+                    else:
+                        try:
+                            await placeholder.edit_text(display_text, parse_mode=ParseMode.HTML)
+                            last_edit_time = time.time()
+                            chars_since_edit = 0
+                            last_display_text = display_text
+                        except BadRequest as e:
+                            logger.debug(f"BadRequest during message edit for user {user.id}: {e}")
+                            # Consider attempting to send the current buffer as a new message here if edit continually fails
+                            # For now, we'll just log and continue, as the error might be "message not modified"
+                            pass
+
+                    # Once the shown text was built from a full message's worth of raw text, it is final.
+                    head_is_final = raw_len >= TELEGRAM_MAX_MESSAGE_LENGTH and display_text == last_display_text
 
         else:
             response_generator = ai_service.get_chat_response(messages, stream=False)
             async for chunk in response_generator:
-                full_response_raw += chunk
+                response_parts.append(chunk)
+
+        full_response_raw = "".join(response_parts)
 
         if not full_response_raw or not full_response_raw.strip():
             logger.warning("Final generated response was empty. Sending an error message to the user.")
@@ -277,15 +376,14 @@ async def chat_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         final_message = await placeholder.edit_text(final_response_text, parse_mode=ParseMode.HTML)
         context.chat_data['last_bot_message_id'] = final_message.message_id
 
-        await db_service.add_message_to_db(user.id, "user", user_text)
-        await db_service.add_message_to_db(user.id, "assistant", full_response_raw)
+        await db_service.add_messages_to_db(user.id, [("user", user_text), ("assistant", full_response_raw)])
 
         count = context.chat_data.get('messages_since_last_summary', 0) + 2
         context.chat_data['messages_since_last_summary'] = count
 
         if count >= config.SUMMARY_THRESHOLD:
             logger.info(f"Message threshold reached for chat {user.id}. Scheduling summarization.")
-            asyncio.create_task(_run_summarization_task(context, user.id))
+            context.application.create_task(_run_summarization_task(context, user.id), update=update)
 
         if config.LOG_USER_CHAT_MESSAGES:
             user_logger = logging_utils.get_user_logger(user.id, user.username)
@@ -302,8 +400,9 @@ async def chat_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             except Exception as edit_e:
                 logger.error(f"Failed to even edit placeholder with error message: {edit_e}")
     finally:
-        monitoring_service.performance_monitor.end_request(request_id=request_id, success=success)
+        if request_id is not None:
+            monitoring_service.performance_monitor.end_request(request_id=request_id, success=success)
 
 def register(application: Application):
     """Registers the main chat handler. Should be added last."""
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, chat_handler))
\ No newline at end of file
+    application.add_handler(MessageHandler(_TEXT_NOT_COMMAND, chat_handler))
\ No newline at end of file
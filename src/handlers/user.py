@@ -14,7 +14,6 @@ from src.utils import logging as logging_utils
 from src.services import database as db_service # For clearing history, getting summaries
 from src.services import ai_models as ai_service # For regenerate, and AI status
 from src.services import monitoring as monitoring_service # For system metrics
-import asyncio # For regenerate and summarization task
 
 logger = logging.getLogger(__name__)
 
@@ -204,7 +203,7 @@ async def summarize_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     from src.handlers.chat import _run_summarization_task
     
     # Run the summarization task in the background
-    asyncio.create_task(_run_summarization_task(context, chat_id))
+    context.application.create_task(_run_summarization_task(context, chat_id), update=update)
     
     await update.message.reply_text("✅ Summarization task initiated. It will complete in the background.")
 
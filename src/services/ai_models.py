@@ -7,6 +7,7 @@ import logging
 import httpx
 import json
 import asyncio
+import time
 from typing import List, Dict, AsyncGenerator, Optional
 
 from openai import OpenAI, APIConnectionError, APITimeoutError
@@ -17,6 +18,15 @@ logger = logging.getLogger(__name__)
 # Initialize the OpenAI client to connect to LM Studio
 ai_client: Optional[OpenAI] = None
 
+# Set when a real request fails so the health check task re-probes right away
+# instead of waiting for its next periodic check.
+health_check_requested = asyncio.Event()
+
+# time.monotonic() of the last completed chat request. While it is recent,
+# is_service_online() trusts it instead of probing the server again.
+last_success_ts: float = 0.0
+RECENT_SUCCESS_WINDOW = 60 # seconds
+
 def init_ai_client():
     """Initializes the AI client once config is confirmed loaded."""
     global ai_client
@@ -51,6 +61,10 @@ async def is_service_online() -> bool:
     if not config.LM_STUDIO_API_BASE:
         return False
 
+    if last_success_ts and time.monotonic() - last_success_ts < RECENT_SUCCESS_WINDOW:
+        logger.debug("AI service answered a request recently; skipping the health probe.")
+        return True
+
     try:
         async with httpx.AsyncClient() as client:
             response = await client.get(f"{config.LM_STUDIO_API_BASE}/v1/models", timeout=3.0)
@@ -79,8 +93,9 @@ async def get_chat_response(messages: list[dict[str, str]], task_type: str = "ch
     [PERMANENT HTTPX VERSION] Calls the AI model and streams the response.
     Bypasses the openai library for chat completions to ensure compatibility.
     """
-    params = config.AI_PARAMS.get(task_type, config.AI_PARAMS["chat"])
-    model_name = params.get("model")
+    global last_success_ts
+    params = config.get_ai_params(task_type)
+    model_name = params.model
 
     if not model_name or model_name.startswith("lm-studio-"):
         logger.error(f"No model specified for task type '{task_type}' in config. Please configure AI_PARAMS.")
@@ -89,10 +104,12 @@ async def get_chat_response(messages: list[dict[str, str]], task_type: str = "ch
     payload = {
         "model": model_name,
         "messages": messages,
-        "temperature": params.get("temperature", 0.7),
+        "temperature": params.temperature,
         "max_tokens": config.MAX_RESPONSE_TOKENS,
         "stream": stream
     }
+    if config.AI_CACHE_PROMPT:
+        payload["cache_prompt"] = True
     url = f"{config.LM_STUDIO_API_BASE}/v1/chat/completions"
     logger.debug(f"Sending POST request to {url}")
 
@@ -113,10 +130,12 @@ async def get_chat_response(messages: list[dict[str, str]], task_type: str = "ch
                             except json.JSONDecodeError:
                                 logger.warning(f"Could not decode JSON from stream line: {line_data}")
                                 continue
+                last_success_ts = time.monotonic()
             else:
                 response = await client.post(url, json=payload)
                 response.raise_for_status()
                 data = response.json()
+                last_success_ts = time.monotonic()
                 
                 if data.get('choices') and len(data['choices']) > 0:
                     content = data['choices'][0].get('message', {}).get('content')
@@ -130,9 +149,13 @@ async def get_chat_response(messages: list[dict[str, str]], task_type: str = "ch
 
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error occurred: {e.response.status_code} - {e.response.text}", exc_info=True)
+        last_success_ts = 0.0
+        health_check_requested.set()
         raise ConnectionError(f"AI service returned an error: {e.response.status_code}") from e
     except httpx.RequestError as e:
         logger.error(f"Request to AI service failed: {e}", exc_info=True)
+        last_success_ts = 0.0
+        health_check_requested.set()
         raise ConnectionError("Failed to connect to AI service.") from e
     except Exception as e:
         logger.critical(f"Unexpected AI error during chat completion: {e}", exc_info=True)
@@ -141,10 +164,7 @@ async def get_chat_response(messages: list[dict[str, str]], task_type: str = "ch
 async def get_generation(prompt: str, task_type: str = "creative") -> str:
     """Gets a single, non-streamed response for generation tasks."""
     messages = [{"role": "user", "content": prompt}]
-    full_response = ""
-    async for chunk in get_chat_response(messages, task_type, stream=False):
-        full_response += chunk
-    return full_response
+    return "".join([chunk async for chunk in get_chat_response(messages, task_type, stream=False)])
 
 # --- NEW: Function to generate a conversation summary ---
 async def get_summary(messages_to_summarize: list[dict]) -> str:
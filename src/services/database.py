@@ -10,17 +10,19 @@ import json
 import time
 import os
 import asyncio
+import threading
 from contextlib import asynccontextmanager
 from typing import Dict, List, Optional, Any, Tuple
 
 import src.config as config
+from src.utils import module_loader
 
-try:
-    import chromadb
-    from sentence_transformers import SentenceTransformer
-    VECTOR_LIBS_INSTALLED = True
-except ImportError:
-    VECTOR_LIBS_INSTALLED = False
+# chromadb and sentence-transformers (which pulls in torch) are slow to import,
+# so only their presence is checked here; init_db() imports them when needed.
+VECTOR_LIBS_INSTALLED = (
+    module_loader.is_module_available("chromadb")
+    and module_loader.is_module_available("sentence_transformers")
+)
 
 logger = logging.getLogger(__name__)
 
@@ -29,12 +31,15 @@ db_pool = None
 vector_db_client = None
 embedding_model = None
 memory_collection = None
+_embedding_model_lock = threading.Lock()
 
 
 # --- Database Initialization ---
 def init_db():
     """Initializes both the SQLite and Vector (ChromaDB) databases."""
-    global db_pool, vector_db_client, embedding_model, memory_collection
+    global db_pool, vector_db_client, memory_collection
+    if db_pool is not None:
+        return
 
     os.makedirs(config.DB_DIR, exist_ok=True)
 
@@ -78,13 +83,11 @@ def init_db():
         return
 
     try:
+        import chromadb
         from chromadb.config import Settings
 
         os.makedirs(config.VECTOR_DB_PATH, exist_ok=True)
 
-        logger.info(f"Loading embedding model: {config.EMBEDDING_MODEL_NAME}...")
-        embedding_model = SentenceTransformer(config.EMBEDDING_MODEL_NAME)
-
         vector_db_client = chromadb.PersistentClient(
             path=config.VECTOR_DB_PATH,
             settings=Settings(anonymized_telemetry=False)
@@ -101,6 +104,35 @@ def init_db():
         logger.critical(f"Vector Database initialization failed: {e}", exc_info=True)
         config.VECTOR_MEMORY_ENABLED = False
 
+def warmup_embedder():
+    """
+    Loads the sentence-transformers embedding model once and stores it in the
+    module global. Blocking; post_init runs it in a worker thread so the model
+    is usually ready before the first message needs it.
+    """
+    global embedding_model
+    if embedding_model is not None:
+        return embedding_model
+
+    with _embedding_model_lock:
+        if embedding_model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+
+                logger.info(f"Loading embedding model: {config.EMBEDDING_MODEL_NAME}...")
+                embedding_model = SentenceTransformer(config.EMBEDDING_MODEL_NAME)
+                logger.info("Embedding model loaded.")
+            except Exception as e:
+                logger.critical(f"Embedding model could not be loaded: {e}", exc_info=True)
+                config.VECTOR_MEMORY_ENABLED = False
+    return embedding_model
+
+async def _get_embedding_model():
+    """Returns the embedding model, loading it in a worker thread if the warmup has not finished."""
+    if embedding_model is not None:
+        return embedding_model
+    return await asyncio.to_thread(warmup_embedder)
+
 
 # --- SQLite Connection Pool Class (Internal) ---
 class _DatabasePool:
@@ -164,28 +196,50 @@ async def update_user_timestamp(user_id: int, timestamp: float):
         )
         await asyncio.to_thread(con.commit)
 
+def _insert_messages(con: sqlite3.Connection, chat_id: int, messages: List[Tuple[str, str]]) -> List[int]:
+    """Inserts (role, content) rows in a single transaction and returns their IDs in order."""
+    db_ids = []
+    for role, content in messages:
+        cursor = con.execute("INSERT INTO conversations (chat_id, role, content) VALUES (?, ?, ?)", (chat_id, role, content))
+        db_ids.append(cursor.lastrowid)
+    con.commit()
+    return db_ids
+
 async def add_message_to_db(chat_id: int, role: str, content: str):
     """Adds a message to SQLite and its vector embedding to ChromaDB."""
-    db_id = None
+    await add_messages_to_db(chat_id, [(role, content)])
+
+async def add_messages_to_db(chat_id: int, messages: List[Tuple[str, str]]):
+    """
+    Adds several (role, content) messages to SQLite with one commit, preserving
+    their order, then adds their vector embeddings to ChromaDB.
+    """
+    if not messages:
+        return
+
     async with get_db_connection() as con:
-        cursor = await asyncio.to_thread(
-            con.execute, "INSERT INTO conversations (chat_id, role, content) VALUES (?, ?, ?)", (chat_id, role, content)
-        )
-        db_id = cursor.lastrowid
-        await asyncio.to_thread(con.commit)
+        db_ids = await asyncio.to_thread(_insert_messages, con, chat_id, messages)
 
-    if config.VECTOR_MEMORY_ENABLED and db_id and embedding_model and memory_collection:
-        try:
-            embedding = await asyncio.to_thread(embedding_model.encode, [content])
-            await asyncio.to_thread(
-                memory_collection.add,
-                embeddings=[embedding[0].tolist()],
-                documents=[content],
-                metadatas=[{"chat_id": chat_id, "timestamp": time.time(), "type": "message"}],
-                ids=[str(db_id)]
-            )
-        except Exception as e:
-            logger.error(f"Failed to add vector embedding for chat {chat_id} (SQLite ID: {db_id}): {e}", exc_info=True)
+    if not (config.VECTOR_MEMORY_ENABLED and memory_collection):
+        return
+    model = await _get_embedding_model()
+    if model is None:
+        return
+
+    # One batched encode and one collection insert for the whole set of messages.
+    contents = [content for _, content in messages]
+    try:
+        embeddings = await asyncio.to_thread(model.encode, contents)
+        timestamp = time.time()
+        await asyncio.to_thread(
+            memory_collection.add,
+            embeddings=[embedding.tolist() for embedding in embeddings],
+            documents=contents,
+            metadatas=[{"chat_id": chat_id, "timestamp": timestamp, "type": "message"} for _ in contents],
+            ids=[str(db_id) for db_id in db_ids]
+        )
+    except Exception as e:
+        logger.error(f"Failed to add vector embeddings for chat {chat_id} (SQLite IDs: {db_ids}): {e}", exc_info=True)
 
 async def add_summary_to_db(chat_id: int, summary_text: str):
     """Adds a conversation summary to the SQLite and vector databases."""
@@ -199,9 +253,12 @@ async def add_summary_to_db(chat_id: int, summary_text: str):
         db_id = cursor.lastrowid
         await asyncio.to_thread(con.commit)
 
-    if config.VECTOR_MEMORY_ENABLED and db_id and embedding_model and memory_collection:
+    if config.VECTOR_MEMORY_ENABLED and db_id and memory_collection:
         try:
-            embedding = await asyncio.to_thread(embedding_model.encode, [summary_text])
+            model = await _get_embedding_model()
+            if model is None:
+                return
+            embedding = await asyncio.to_thread(model.encode, [summary_text])
             await asyncio.to_thread(
                 memory_collection.add,
                 embeddings=[embedding[0].tolist()],
@@ -216,12 +273,13 @@ async def add_summary_to_db(chat_id: int, summary_text: str):
 async def get_history_from_db(chat_id: int, limit: int = 50) -> List[Dict[str, Any]]:
     """Retrieves conversation history from SQLite, including message IDs."""
     async with get_db_connection() as con:
-        con.row_factory = sqlite3.Row
+        # Plain tuples are unpacked positionally; a sqlite3.Row factory would also
+        # stick to this pooled connection for every later caller.
         query = "SELECT id, role, content FROM conversations WHERE chat_id = ? ORDER BY timestamp DESC LIMIT ?"
         cursor = await asyncio.to_thread(con.execute, query, (chat_id, limit))
         rows = await asyncio.to_thread(cursor.fetchall)
         rows.reverse()
-        return [{"id": row["id"], "role": row["role"], "content": row["content"]} for row in rows]
+        return [{"id": msg_id, "role": role, "content": content} for msg_id, role, content in rows]
 
 async def get_summaries_from_db(chat_id: int, limit: int = 5) -> List[str]:
     """Retrieves the most recent summaries for a given chat."""
@@ -253,11 +311,14 @@ async def search_semantic_memory(chat_id: int, query_text: str) -> List[str]:
     """
     Performs a hybrid semantic search, prioritizing one summary and then recent messages.
     """
-    if not config.VECTOR_MEMORY_ENABLED or not memory_collection or not embedding_model:
+    if not config.VECTOR_MEMORY_ENABLED or not memory_collection:
         return []
 
     try:
-        query_embedding = await asyncio.to_thread(embedding_model.encode, [query_text])
+        model = await _get_embedding_model()
+        if model is None:
+            return []
+        query_embedding = await asyncio.to_thread(model.encode, [query_text])
 
         # 1. Search for the single most relevant summary
         summary_results = await asyncio.to_thread(
@@ -357,21 +418,24 @@ async def get_all_blocked_users() -> List[Tuple[int, Optional[float], Optional[s
         cursor = await asyncio.to_thread(con.execute, "SELECT user_id, blocked_until, reason FROM blocked_users")
         return await asyncio.to_thread(cursor.fetchall)
 
-async def get_timed_unblocks() -> List[int]:
-    """Retrieves user_ids whose timed blocks have expired."""
-    current_time = time.time()
-    unblock_ids = []
-    async with get_db_connection() as con:
-        # Select users where blocked_until is not NULL and is less than current time
-        cursor = await asyncio.to_thread(
-            con.execute,
-            "SELECT user_id FROM blocked_users WHERE blocked_until IS NOT NULL AND blocked_until < ?",
-            (current_time,)
-        )
-        rows = await asyncio.to_thread(cursor.fetchall)
-        unblock_ids = [row[0] for row in rows]
+def _delete_expired_blocks(con: sqlite3.Connection, current_time: float) -> List[int]:
+    """Deletes expired timed blocks in one statement and returns the freed user_ids."""
+    cursor = con.execute(
+        "DELETE FROM blocked_users WHERE blocked_until IS NOT NULL AND blocked_until < ? RETURNING user_id",
+        (current_time,)
+    )
+    unblock_ids = [row[0] for row in cursor.fetchall()]
+    con.commit()
     return unblock_ids
 
-async def unblock_user_by_id(user_id: int):
-    """Directly unblocks a user by ID, primarily for background task."""
-    await remove_blocked_user(user_id)
\ No newline at end of file
+async def sweep_timed_unblocks() -> List[int]:
+    """Removes all timed blocks that have expired and returns the unblocked user_ids."""
+    async with get_db_connection() as con:
+        return await asyncio.to_thread(_delete_expired_blocks, con, time.time())
+
+async def get_next_unblock_time() -> Optional[float]:
+    """Returns the earliest blocked_until timestamp among timed blocks, or None if there are none."""
+    async with get_db_connection() as con:
+        cursor = await asyncio.to_thread(con.execute, "SELECT MIN(blocked_until) FROM blocked_users WHERE blocked_until IS NOT NULL")
+        row = await asyncio.to_thread(cursor.fetchone)
+    return row[0] if row else None
\ No newline at end of file
@@ -40,6 +40,8 @@ class _PerformanceMonitor:
         # Keep a deque for a fixed-size history of completed requests
         self.completed_request_history: Deque[RequestMetrics] = deque(maxlen=1000)
         self.start_time: float = time.time()
+        # Completed requests recorded since the last successful report export
+        self.samples_since_export: int = 0
 
     def start_request(self, user_id: int, request_type: str) -> str:
         request_id = f"{int(time.time() * 1000)}_{user_id}"
@@ -54,9 +56,13 @@ class _PerformanceMonitor:
             metrics.success = success
             metrics.queue_wait_time = queue_wait_time
             self.completed_request_history.append(metrics) # Add to completed history
+            self.samples_since_export += 1
         else:
             logger.warning(f"Attempted to end request {request_id} which was not found or already ended.")
 
+    def has_new_samples(self) -> bool:
+        return self.samples_since_export > 0
+
     # Added method to get overall stats, assuming it aggregates from completed_request_history
     def get_overall_stats(self) -> Dict[str, Any]:
         uptime_seconds = time.time() - self.start_time
@@ -93,6 +99,7 @@ class _PerformanceMonitor:
             data = [m.__dict__ for m in self.completed_request_history if m.end_time]
             with open(filepath, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, default=str)
+            self.samples_since_export = 0
             logger.info(f"Performance report exported to {filepath}.")
         except Exception as e:
             logger.error(f"Failed to export performance report to {filepath}: {e}", exc_info=True)
@@ -127,5 +134,8 @@ system_monitor = _SystemMonitor()
 async def export_performance_report(filepath: str):
     await performance_monitor.export_report(filepath)
 
+def has_new_performance_samples() -> bool:
+    return performance_monitor.has_new_samples()
+
 def get_system_metrics() -> Dict[str, Any]:
     return system_monitor.get_metrics()
\ No newline at end of file
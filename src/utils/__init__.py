@@ -3,4 +3,6 @@
 from . import files
 from . import logging
 from . import module_loader
+from . import background
+from . import formatting
 from . import error_handler # NEW: Add this line
\ No newline at end of file
@@ -0,0 +1,30 @@
+# src/utils/background.py
+"""
+Runs non-critical, fire-and-forget work started from handlers.
+"""
+import logging
+from typing import Any, Coroutine, Optional
+
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+async def _log_failure(coro: Coroutine, description: str, level: int):
+    try:
+        await coro
+    except Exception as e:
+        logger.log(level, f"Background {description} failed: {e}")
+
+def run_in_background(
+    application: Application,
+    coro: Coroutine,
+    description: str,
+    update: Optional[Any] = None,
+    level: int = logging.DEBUG,
+):
+    """
+    Schedules a coroutine via application.create_task, which keeps it referenced until
+    it finishes. Failures are only logged at the given level; they do not reach the
+    global error handler, which would message the user and the bot owner.
+    """
+    return application.create_task(_log_failure(coro, description, level), update=update)
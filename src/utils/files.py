@@ -5,59 +5,121 @@ such as loading data from files.
 """
 import os
 import json
+import pickle
+import asyncio
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-def load_from_directory(path: str, key_name: str = "name") -> Dict[str, Any]:
-    """
-    Loads all .json files from a specified directory into a dictionary.
-
-    Args:
-        path (str): The absolute or relative path to the directory.
-        key_name (str): The key within the JSON file to use as the dictionary
-                        key for the returned data. Defaults to "name".
-
-    Returns:
-        Dict[str, Any]: A dictionary containing data from the JSON files.
-    """
-    
-    # TEMPORARY DEBUG: Force this logger to DEBUG level
-    logger.setLevel(logging.DEBUG)
-    
-    data: Dict[str, Any] = {}
-    
+def _list_json_files(path: str) -> List[Tuple[str, str]]:
+    """Returns (filename, filepath) pairs for the .json files directly inside path."""
     # Ensure the assets directory exists before trying to read from it.
     os.makedirs(path, exist_ok=True) # This is also handled by application.py, but remains for standalone use.
-    
+
     if not os.path.isdir(path):
         logger.warning(f"Path is not a directory, cannot load files: {path}")
+        return []
+
+    # scandir yields the file type with each entry, so non-files are skipped without an extra stat.
+    with os.scandir(path) as entries:
+        return [(entry.name, entry.path) for entry in entries if entry.name.endswith(".json") and entry.is_file()]
+
+def _read_json_file(filename: str, filepath: str) -> Optional[Any]:
+    """Parses one JSON file, logging and returning None if it cannot be read."""
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse JSON from {filename}: {e}")
+    except IOError as e:
+        logger.error(f"Failed to read file {filename}: {e}")
+    return None
+
+def _store_by_key(data: Dict[str, Any], filename: str, content: Any, key_name: str):
+    """Stores parsed file content under its key_name value, or under the filename as a fallback."""
+    key = content.get(key_name)
+    if key:
+        data[key] = content
+    else:
+        # Fallback to using the filename without extension as the key
+        file_key = os.path.splitext(filename)[0]
+        data[file_key] = content
+        logger.debug(
+            f"File '{filename}' is missing the key '{key_name}'. "
+            f"Using filename '{file_key}' as key instead."
+        )
+
+async def load_from_directory_async(path: str, key_name: str = "name") -> Dict[str, Any]:
+    """
+    Loads all .json files from a directory into a dictionary keyed by each
+    file's key_name value (or its filename when that key is missing). The
+    files are read and parsed concurrently in worker threads, keeping the
+    event loop free.
+    """
+    json_files = await asyncio.to_thread(_list_json_files, path)
+    contents = await asyncio.gather(
+        *(asyncio.to_thread(_read_json_file, filename, filepath) for filename, filepath in json_files)
+    )
+
+    data: Dict[str, Any] = {}
+    for (filename, _), content in zip(json_files, contents):
+        if content is not None:
+            _store_by_key(data, filename, content, key_name)
+    return data
+
+def _directory_fingerprint(path: str) -> Tuple[Tuple[str, int, int], ...]:
+    """Returns a (filename, mtime_ns, size) snapshot of the .json files in path."""
+    fingerprint = []
+    for filename, filepath in _list_json_files(path):
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            continue
+        fingerprint.append((filename, st.st_mtime_ns, st.st_size))
+    return tuple(sorted(fingerprint))
+
+def _read_cache(cache_file: str, fingerprint: Tuple) -> Optional[Dict[str, Any]]:
+    """Returns the cached data if cache_file matches the fingerprint, otherwise None."""
+    try:
+        with open(cache_file, "rb") as f:
+            cached = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e: # A stale or corrupt cache is simply rebuilt
+        logger.warning(f"Ignoring unreadable cache file {cache_file}: {e}")
+        return None
+    if not isinstance(cached, dict) or cached.get("fingerprint") != fingerprint:
+        return None
+    return cached.get("data")
+
+def _write_cache(cache_file: str, fingerprint: Tuple, data: Dict[str, Any]):
+    """Atomically writes the fingerprint and data to cache_file."""
+    tmp_file = f"{cache_file}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+        with open(tmp_file, "wb") as f:
+            pickle.dump({"fingerprint": fingerprint, "data": data}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except (OSError, pickle.PickleError) as e:
+        logger.warning(f"Failed to write cache file {cache_file}: {e}")
+
+async def load_from_directory_cached(path: str, cache_file: str, key_name: str = "name") -> Dict[str, Any]:
+    """
+    Like load_from_directory_async(), but keeps the parsed result in a single
+    pickle file. While no .json file in the directory was added, removed or
+    modified, startup reads that one file instead of parsing every JSON.
+    """
+    fingerprint = await asyncio.to_thread(_directory_fingerprint, path)
+    data = await asyncio.to_thread(_read_cache, cache_file, fingerprint)
+    if data is not None:
+        logger.debug(f"Loaded {len(data)} entries for '{path}' from cache {cache_file}")
         return data
 
-    for filename in os.listdir(path):
-        if filename.endswith(".json"):
-            filepath = os.path.join(path, filename)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content = json.load(f)
-                    key = content.get(key_name)
-                    if key:
-                        data[key] = content
-                    else:
-                        # Fallback to using the filename without extension as the key
-                        file_key = os.path.splitext(filename)[0]
-                        data[file_key] = content
-                        logger.debug(
-                            f"File '{filename}' is missing the key '{key_name}'. "
-                            f"Using filename '{file_key}' as key instead."
-                        )
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON from {filename}: {e}")
-            except IOError as e:
-                logger.error(f"Failed to read file {filename}: {e}")
+    data = await load_from_directory_async(path, key_name=key_name)
+    await asyncio.to_thread(_write_cache, cache_file, fingerprint, data)
     return data
-    
+
 def load_json(filepath, default=None):
     """Load a JSON file safely. Return default if missing or broken."""
     if not os.path.isfile(filepath):
@@ -76,11 +138,16 @@ def load_json(filepath, default=None):
         return default or {}
 
 def save_json(filepath, data):
-    """Write data to JSON file safely."""
+    """Write data to JSON file safely, replacing the old file atomically."""
+    tmp_path = f"{filepath}.tmp"
     try:
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Serialize fully before touching the disk, then swap the file in, so a
+        # crash mid-write can never leave a truncated JSON behind.
+        payload = json.dumps(data, indent=2, ensure_ascii=False)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, filepath)
         return True
     except (IOError, OSError) as e:
         logger.error(f"Failed to write file {filepath}: {e}")
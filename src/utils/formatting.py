@@ -0,0 +1,9 @@
+# src/utils/formatting.py
+"""
+Shared formatting helpers for user-facing text.
+"""
+from datetime import datetime
+
+def format_timestamp(dt: datetime) -> str:
+    """Formats a local datetime as 'YYYY-MM-DD HH:MM:SS CEST'; isoformat avoids strftime's format parsing."""
+    return dt.isoformat(sep=' ', timespec='seconds') + ' CEST'
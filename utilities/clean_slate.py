@@ -2,22 +2,67 @@
 import os
 import shutil
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure basic logging for the script itself
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
+def _remove_tree(path):
+    """Removes a directory tree that is already known to exist."""
+    try:
+        shutil.rmtree(path)
+        logger.info(f"Successfully deleted: {path}")
+    except OSError as e:
+        logger.error(f"Error deleting {path}: {e}")
+
 def delete_directory(path):
     """Deletes a directory if it exists."""
-    if os.path.exists(path) and os.path.isdir(path):
-        try:
-            shutil.rmtree(path)
-            logger.info(f"Successfully deleted: {path}")
-        except OSError as e:
-            logger.error(f"Error deleting {path}: {e}")
+    if os.path.isdir(path):
+        _remove_tree(path)
     else:
         logger.info(f"Directory not found or not a directory, skipping: {path}")
 
+def find_pycache_dirs(start_path):
+    """
+    Returns the paths of every __pycache__ directory below start_path.
+
+    Uses an explicit stack of os.scandir() iterators so each entry's type comes
+    from the cached DirEntry data instead of a separate stat() call, and never
+    descends into a __pycache__ directory, since it is going to be removed.
+    """
+    found = []
+    stack = [start_path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                    if entry.name == '__pycache__':
+                        found.append(entry.path)
+                    else:
+                        stack.append(entry.path)
+        except OSError as e:
+            logger.error(f"Error scanning {current}: {e}")
+    return found
+
+def delete_pycache_dirs(start_path):
+    """
+    Deletes every __pycache__ directory below start_path.
+
+    rmtree() spends nearly all of its time in unlink()/rmdir() syscalls, which
+    release the GIL, so the removals are spread across a thread pool.
+    """
+    paths = find_pycache_dirs(start_path)
+    if not paths:
+        return
+    max_workers = min(32, (os.cpu_count() or 1) * 4, len(paths))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # _remove_tree logs and swallows OSError, so one failure never aborts the rest.
+        list(executor.map(_remove_tree, paths))
+
 def main():
     """Performs a clean slate operation for the bot project."""
     # --- MODIFICATION START ---
@@ -31,12 +76,7 @@ def main():
 
     # 1. Delete all __pycache__ directories 
     logger.info("Searching for and deleting __pycache__ directories...")
-    for dirpath, dirnames, filenames in os.walk(project_root):
-        if '__pycache__' in dirnames:
-            pycache_path = os.path.join(dirpath, '__pycache__')
-            delete_directory(pycache_path)
-            # Remove from dirnames to prevent os.walk from trying to enter it
-            dirnames.remove('__pycache__') 
+    delete_pycache_dirs(project_root)
     logger.info("Finished deleting __pycache__ directories.")
 
     # 2. Delete the /data directory 